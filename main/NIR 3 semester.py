@@ -64,6 +64,57 @@ def try_frame_difference():
         image_processing.save_image(all_masks / 255, "Results/Frame difference", i, "mask")
 
 
+def frame_difference_per_pixel(current_rgb, previous_rgb, current_depth, previous_depth, rgb_threshold):
+    """Per-pixel frame difference, kept as a reference for FrameDifference.subtraction_mask"""
+    rgb_subtraction = current_rgb - previous_rgb
+    mask = np.zeros_like(current_depth)
+    for i in range(rgb_subtraction.shape[0]):
+        for j in range(rgb_subtraction.shape[1]):
+            if rgb_subtraction[i, j, 0] * rgb_subtraction[i, j, 0] + rgb_subtraction[i, j, 1] * rgb_subtraction[
+                i, j, 1] + rgb_subtraction[i, j, 2] * rgb_subtraction[i, j, 2] > rgb_threshold and \
+                    previous_depth[i, j] - current_depth[i, j] > 0:
+                mask[i, j] = 1
+    return mask
+
+
+def benchmark_frame_difference(path="falling balls and cylinder", number_of_frames=5, repeats=20):
+    """Comparing speed and result of per-pixel and whole-frame frame difference"""
+    rgb_images, depth_images = [], []
+    for i in range(number_of_frames):
+        rgb_images.append(image_processing.load_image(path, "rgb_" + str(i) + ".png") / 255)
+        depth_images.append(image_processing.load_image(path, "depth_" + str(i) + ".png", "depth") / 255)
+
+    frame_difference = FrameDifference(depth_images[0], rgb_images[0], 0.3, 0.005)
+    per_pixel_time, whole_frame_time, float32_time = 0, 0, 0
+    identical = True
+    for i in range(1, number_of_frames):
+        frame_difference.current_depth = depth_images[i]
+        frame_difference.current_rgb = rgb_images[i]
+
+        start = time.time()
+        reference = frame_difference_per_pixel(rgb_images[i], rgb_images[i - 1], depth_images[i], depth_images[i - 1],
+                                               0.3)
+        per_pixel_time += time.time() - start
+
+        start = time.time()
+        for _ in range(repeats):
+            mask = frame_difference.subtraction_mask()
+        whole_frame_time += (time.time() - start) / repeats
+
+        start = time.time()
+        for _ in range(repeats):
+            mask_float32 = frame_difference.subtraction_mask(np.float32)
+        float32_time += (time.time() - start) / repeats
+
+        identical = identical and np.array_equal(reference, mask)
+        print("frame", i, "float32 differs in", int(np.sum(reference != mask_float32)), "pixels")
+
+    print("identical masks:", identical)
+    print("per-pixel fps: ", (number_of_frames - 1) / per_pixel_time)
+    print("whole frame fps: ", (number_of_frames - 1) / whole_frame_time)
+    print("whole frame float32 fps: ", (number_of_frames - 1) / float32_time)
+
+
 def try_ViBE():
     rgb_im = image_processing.load_image("falling balls and cylinder", "rgb_" + str(0) + ".png")
     start = time.time()
@@ -147,6 +198,22 @@ def try_fast_RGBD_MoG():
     #     # image_processing.save_image(mask / 255, "Results/RGBD MoG", i, "mask")
 
 
+def try_tiled_detection(number_of_bands=4):
+    from tiled_detection import TiledDetector
+
+    rgb_im = image_processing.load_image("falling balls and cylinder", "rgb_" + str(0) + ".png")
+    depth_im = image_processing.load_image("falling balls and cylinder", "depth_" + str(0) + ".png", "depth")
+    start = time.time()
+    with TiledDetector(Fast_RGBD_MoG, rgb_im, depth_im, number_of_bands, number_of_gaussians=3) as mog:
+        print("initialization: ", time.time() - start)
+        for i in range(5):
+            rgb_im = image_processing.load_image("falling balls and cylinder", "rgb_" + str(i) + ".png")
+            depth_im = image_processing.load_image("falling balls and cylinder", "depth_" + str(i) + ".png", "depth")
+            start = time.time()
+            mask = mog.get_mask(rgb_im, depth_im)
+            print("frame updating: ", time.time() - start)
+
+
 def show_image(image):
     cv2.imshow("", image)
     cv2.waitKey(0)
@@ -156,8 +223,10 @@ def show_image(image):
 if __name__ == "__main__":
     # try_vrep_connection()
     # try_frame_difference()
+    # benchmark_frame_difference()
     # try_ViBE()
     # try_DEVB()
     # try_RGB_MoG()
     try_RGBD_MoG()
     # try_fast_RGBD_MoG()
+    # try_tiled_detection()
@@ -171,8 +171,7 @@ def generate_found_shapes(object, found_centers, probabilities_of_centers, numbe
     rgb = matplotlib.colors.hsv_to_rgb(hsv)
 
     center = object.get_center()
-    points = object.get_points()[0]
-    points -= center
+    points = object.get_points()[0] - center
 
     for f, f_center in enumerate(found_centers):
         current_shape = PointsObject()
@@ -289,7 +288,8 @@ def find_observations_v1(objects, initial_center):
     for i in range(len(objects) - 1):
         source_points = objects[i].get_points()[0]
         target_points = objects[i + 1].get_points()[0]
-        transformation = open3d_icp.get_transformation_matrix_p2p(source_points, target_points)
+        transformation = open3d_icp.get_transformation_matrix_p2p(objects[i].get_point_cloud(),
+                                                                  objects[i + 1].get_point_cloud())
         found_dt_rotations[i] = moving_prediction.get_angles_from_transformation(transformation[:3, :3])
         found_dt_center_shifts[i] = moving_prediction.get_movement_from_transformation(transformation, source_points,
                                                                                        target_points)
@@ -307,7 +307,8 @@ def find_observations_v2(objects, initial_center, initial_points):
     found_center_shifts = np.zeros((len(objects) - 1, 3))
     for i in range(len(objects) - 1):
         target_points = objects[i + 1].get_points()[0]
-        transformation = open3d_icp.get_transformation_matrix_p2p(initial_points, target_points)
+        transformation = open3d_icp.get_transformation_matrix_p2p(initial_points,
+                                                                  objects[i + 1].get_point_cloud())
         found_rotations[i] = moving_prediction.get_angles_from_transformation(transformation[:3, :3])
         found_center_shifts[i] = moving_prediction.get_movement_from_transformation(transformation, initial_points,
                                                                                     target_points)
@@ -326,7 +327,8 @@ def find_observations_v3(objects, initial_center):
     for i in range(len(objects) - 1):
         source_points = objects[i].get_points()[0]
         target_points = objects[i + 1].get_points()[0]
-        transformation = open3d_icp.get_transformation_matrix_p2p(source_points, target_points)
+        transformation = open3d_icp.get_transformation_matrix_p2p(objects[i].get_point_cloud(),
+                                                                  objects[i + 1].get_point_cloud())
         rotation_funcs.append(R.from_matrix(transformation[:3, :3]))
         found_dt_center_shifts[i] = moving_prediction.get_movement_from_transformation(transformation, source_points,
                                                                                        target_points)
@@ -349,7 +351,8 @@ def find_observations(objects, initial_center):
     for i in range(len(objects) - 1):
         source_points = objects[i].get_points()[0]
         target_points = objects[i + 1].get_points()[0]
-        transformation = open3d_icp.get_transformation_matrix_p2p(source_points, target_points)
+        transformation = open3d_icp.get_transformation_matrix_p2p(objects[i].get_point_cloud(),
+                                                                  objects[i + 1].get_point_cloud())
         current_transformation = transformation.dot(previous_transformation)
         previous_transformation = np.copy(current_transformation)
         found_rotations[i] = moving_prediction.get_angles_from_transformation(current_transformation[:3, :3])
@@ -1,7 +1,9 @@
 import numpy as np
+import math
 import random
 import time
 import sys
+from collections import deque
 
 from points_object import PointsObject
 from moving_prediction import MovementFunctions
@@ -45,6 +47,397 @@ def check_moving_detection():
         visualization.show_image(mask/255)
 
 
+def load_frames(path, frames):
+    """Rgb and depth images of frames of dataset as they are loaded
+
+    Arguments:
+        path (str): folder of dataset with rgb_<i>.png and depth_<i>.png images
+        frames (iterable): numbers of frames
+
+    Return:
+        rgb (list): rgb images
+        depth (list): depth images
+    """
+    rgb = [image_processing.load_image(path, "rgb_" + str(i) + ".png") for i in frames]
+    depth = [image_processing.load_image(path, "depth_" + str(i) + ".png", "depth") for i in frames]
+    return rgb, depth
+
+
+def compare_masks(name, mask, reference_mask, tolerance=0):
+    """Asserting that no more than tolerance pixels are moving in one mask and not moving in the other
+
+    Return:
+        different_pixels (int): number of different pixels
+    """
+    different_pixels = np.count_nonzero((mask > 0) != (reference_mask > 0))
+    assert different_pixels <= tolerance, \
+        name + ": " + str(different_pixels) + " different pixels, " + str(tolerance) + " are allowed"
+    return different_pixels
+
+
+def compare_arrays(name, array, reference, max_error=0.):
+    """Asserting that arrays have the same shape and NaN and differ by no more than max_error
+
+    Lists and tuples, like regions or point clouds of labels, are compared element by element.
+
+    Return:
+        error (float): the largest absolute difference
+    """
+    if isinstance(reference, (list, tuple)):
+        assert len(array) == len(reference), name + ": " + str(len(array)) + " elements instead of " + \
+            str(len(reference))
+        return max([compare_arrays(name + " [" + str(i) + "]", element, reference_element, max_error)
+                    for i, (element, reference_element) in enumerate(zip(array, reference))], default=0.)
+    array, reference = np.asarray(array), np.asarray(reference)
+    assert array.shape == reference.shape, name + ": shape " + str(array.shape) + " instead of " + str(reference.shape)
+    assert np.array_equal(np.isnan(array), np.isnan(reference)), name + ": NaN are in different places"
+    difference = np.abs(array.astype(float) - reference)
+    error = np.nanmax(difference) if np.any(~np.isnan(difference)) else 0.
+    assert error <= max_error, name + ": difference " + str(error) + ", " + str(max_error) + " is allowed"
+    return error
+
+
+def check_fast_rgbd_mog(path="falling balls and cylinder", number_of_frames=5, tolerance=0):
+    """Comparing masks of Fast_RGBD_MoG and per-pixel RGBD_MoG on every frame of dataset
+
+    Fast_RGBD_MoG repeats the arithmetic of RGBD_MoG, so masks are expected to be identical; tolerance is the number of
+    pixels which are allowed to differ in a frame.
+    """
+    import moving_detection
+
+    rgb, depth = load_frames(path, range(number_of_frames))
+    reference = moving_detection.RGBD_MoG(rgb[0], depth[0], number_of_gaussians=3)
+    fast = moving_detection.Fast_RGBD_MoG(rgb[0], depth[0], number_of_gaussians=3)
+    for i in range(number_of_frames):
+        reference_mask = reference.set_mask(rgb[i], depth[i])
+        different_pixels = compare_masks("Fast_RGBD_MoG in frame " + str(i), fast.get_mask(rgb[i], depth[i]),
+                                         reference_mask, tolerance)
+        print("frame", i, "different pixels:", different_pixels)
+
+
+def check_precision(path="falling balls and cylinder", number_of_frames=5, tolerance=0.002):
+    """Comparing masks of detectors in float64 with the ones in reduced precision
+
+    ViBE and DEVB keep samples of uint8 images and calculate distances in float32, so their thresholds are scaled from
+    the units of images divided by 255. RGB_MoG and Fast_RGBD_MoG keep gaussians in float32, Fast_RGBD_MoG converts
+    colors to YUV in fixed point. Random decisions are the same for both precisions. Differences measured on the
+    datasets are recorded in README.md.
+
+    Arguments:
+        tolerance (float): part of pixels of a frame, which are allowed to differ
+
+    Return:
+        different_pixels (dict): number of different pixels in every frame by name of detector
+    """
+    import moving_detection
+
+    rgb, depth = load_frames(path, range(number_of_frames))
+
+    detectors = {
+        "FrameDifference": (moving_detection.FrameDifference(depth[0] / 255, rgb[0] / 255),
+                            moving_detection.FrameDifference(depth[0].astype(np.float32) / 255,
+                                                             rgb[0].astype(np.float32) / 255), True),
+        "ViBE": (moving_detection.ViBЕ(rgb[0] / 255, batch_mode=True, seed=0),
+                 moving_detection.ViBЕ(rgb[0], threshold_r=20 * 255, batch_mode=True, seed=0, dtype=np.float32), True),
+        "DEVB": (moving_detection.DEVB(rgb[0] / 255, depth[0] / 255, batch_mode=True, seed=0),
+                 moving_detection.DEVB(rgb[0], depth[0], threshold_r=20 * 255, threshold_theta=3, batch_mode=True,
+                                       seed=0, dtype=np.float32), True),
+        "RGB_MoG": (moving_detection.RGB_MoG(rgb[0]), moving_detection.RGB_MoG(rgb[0], dtype=np.float32), False),
+        "Fast_RGBD_MoG": (moving_detection.Fast_RGBD_MoG(rgb[0], depth[0]),
+                          moving_detection.Fast_RGBD_MoG(rgb[0], depth[0], dtype=np.float32), False)}
+
+    different_pixels = {}
+    for name, (reference, reduced, scaled) in detectors.items():
+        different_pixels[name] = []
+        for i in range(1, number_of_frames):
+            reference_mask = reference.process(rgb[i] / 255, depth[i] / 255) if scaled else \
+                reference.process(rgb[i], depth[i])
+            if name == "FrameDifference":
+                reduced_mask = reduced.process(rgb[i].astype(np.float32) / 255, depth[i].astype(np.float32) / 255)
+            else:
+                reduced_mask = reduced.process(rgb[i], depth[i])
+            different_pixels[name].append(compare_masks(name + " in frame " + str(i), reduced_mask, reference_mask,
+                                                        int(tolerance * reference_mask.size)))
+        print(name, "different pixels:", different_pixels[name], "of", rgb[0].shape[0] * rgb[0].shape[1],
+              "moving pixels:", np.count_nonzero(reference_mask))
+    return different_pixels
+
+
+def check_detector_checkpoint(path="falling balls and cylinder", file_name="detector.npz"):
+    """Checking that detector loaded from checkpoint gives the same masks as the saved one"""
+    import moving_detection
+
+    rgb, depth = load_frames(path, range(5))
+    detectors = [moving_detection.ViBЕ(rgb[0] / 255, batch_mode=True, seed=0),
+                 moving_detection.DEVB(rgb[0] / 255, depth[0] / 255, batch_mode=True, seed=0),
+                 moving_detection.RGB_MoG(rgb[0]), moving_detection.Fast_RGBD_MoG(rgb[0], depth[0]),
+                 moving_detection.Fast_RGBD_MoG(rgb[0], depth[0], refresh_period=2, stable_frames=1)]
+    for detector in detectors:
+        scale = 255 if isinstance(detector, (moving_detection.ViBЕ, moving_detection.DEVB)) else 1
+        for i in range(1, 3):
+            detector.process(rgb[i] / scale, depth[i] / scale)
+        moving_detection.save_detector(detector, file_name)
+        loaded = moving_detection.load_detector(file_name)
+        for i in range(3, 5):
+            mask = np.copy(detector.process(rgb[i] / scale, depth[i] / scale))
+            compare_arrays(type(detector).__name__ + " after loading in frame " + str(i),
+                           loaded.process(rgb[i] / scale, depth[i] / scale), mask)
+        print(type(detector).__name__, "is restored")
+
+
+def check_sparse_mog(path="falling balls and cylinder", refresh_period=8, stable_frames=3, number_of_repeats=3,
+                     tolerance=0.005):
+    """Comparing masks and time of Fast_RGBD_MoG with the ones in sparse mode
+
+    Frames of dataset are shown forwards and backwards number_of_repeats times, so some pixels become stable;
+    tolerance is the part of pixels of a frame, which are allowed to differ.
+    """
+    import moving_detection
+
+    rgb, depth = load_frames(path, range(5))
+    full = moving_detection.Fast_RGBD_MoG(rgb[0], depth[0])
+    sparse = moving_detection.Fast_RGBD_MoG(rgb[0], depth[0], refresh_period=refresh_period,
+                                            stable_frames=stable_frames)
+    frames = [0, 0, 0, 1, 2, 3, 4, 4, 4, 3, 2, 1] * number_of_repeats
+    full_time, sparse_time, different_pixels = 0, 0, 0
+    for number, i in enumerate(frames):
+        start = time.time()
+        full_mask = np.copy(full.get_mask(rgb[i], depth[i]))
+        full_time += time.time() - start
+        start = time.time()
+        sparse_mask = sparse.get_mask(rgb[i], depth[i])
+        sparse_time += time.time() - start
+        different_pixels += compare_masks("sparse Fast_RGBD_MoG in frame " + str(number), sparse_mask, full_mask,
+                                          int(tolerance * full_mask.size))
+    print("full:", full_time / len(frames), "sparse:", sparse_time / len(frames),
+          "different pixels per frame:", different_pixels / len(frames))
+
+
+def check_pyramid_detection(path="falling balls and cylinder", scales=(2, 4), dilation=2, least_iou=(0.8, 0.6)):
+    """Comparing quality and time of detectors on full frames with the ones refined from downsampled frames
+
+    least_iou is the least intersection over union of masks for every scale. Results measured on the datasets are
+    recorded in README.md.
+    """
+    import moving_detection
+    from moving_detection import create_detector
+    from pyramid_detection import PyramidDetector
+
+    rgb, depth = load_frames(path, range(5))
+    frames = [0, 0, 0, 1, 2, 3, 4, 4, 4, 3, 2, 1, 0, 0]
+    for detector_class in (moving_detection.ViBЕ, moving_detection.DEVB, moving_detection.Fast_RGBD_MoG):
+        # ViBE and DEVB work with images in [0, 1], in batch mode and are seeded to compare masks of the same random
+        # updates
+        if detector_class is moving_detection.Fast_RGBD_MoG:
+            rgb_frames, depth_frames, parameters = rgb, depth, {}
+        else:
+            rgb_frames, depth_frames, parameters = [im / 255 for im in rgb], [im / 255 for im in depth], \
+                {"batch_mode": True, "seed": 0}
+
+        full = create_detector(detector_class, rgb_frames[0], depth_frames[0], **parameters)
+        full_masks = []
+        start = time.time()
+        for i in frames:
+            full_masks.append(full.process(rgb_frames[i], depth_frames[i]) > 0)
+        print(detector_class.__name__, "full:", (time.time() - start) / len(frames))
+
+        for scale, scale_least_iou in zip(scales, least_iou):
+            pyramid = PyramidDetector(detector_class, rgb_frames[0], depth_frames[0], scale, dilation, **parameters)
+            intersection, union, different_pixels = 0, 0, 0
+            start = time.time()
+            for i, full_mask in zip(frames, full_masks):
+                mask = pyramid.process(rgb_frames[i], depth_frames[i]) > 0
+                intersection += np.count_nonzero(full_mask & mask)
+                union += np.count_nonzero(full_mask | mask)
+                different_pixels += np.count_nonzero(full_mask != mask)
+            iou = intersection / max(union, 1)
+            print("  scale", scale, "pyramid:", (time.time() - start) / len(frames),
+                  "IoU:", iou, "different pixels per frame:", different_pixels / len(frames))
+            assert iou >= scale_least_iou, detector_class.__name__ + " at scale " + str(scale) + ": IoU " + str(iou) + \
+                ", " + str(scale_least_iou) + " is allowed"
+
+
+def region_growing_per_pixel(movement_mask, current_depth, depth_threshold=0.05, significant_number_of_points=100):
+    """Reference region growing by breadth-first search from every seed, as it was before label_regions"""
+    masks = []
+    seeds = movement_mask * current_depth
+    done = np.zeros_like(seeds)
+
+    while not np.sum(seeds) == 0:
+        ind_i = math.floor(np.argmax(seeds) / current_depth.shape[1])
+        ind_j = np.argmax(seeds) - ind_i * current_depth.shape[1]
+        mask = np.zeros_like(current_depth)
+
+        q = deque()
+
+        q.append([ind_i, ind_j])
+        seeds[ind_i, ind_j] = 0
+        done[ind_i, ind_j] = 1
+        mask[ind_i, ind_j] = 1
+
+        while q:
+            ind = q.popleft()
+            for i in range(ind[0] - 1, ind[0] + 2):
+                for j in range(ind[1] - 1, ind[1] + 2):
+                    if -1 < i < current_depth.shape[0] and -1 < j < current_depth.shape[1]:
+                        if not done[i, j] == 1 and not current_depth[i, j] >= 1:
+                            if math.fabs(
+                                    current_depth[i, j] - current_depth[ind[0], ind[1]]) < depth_threshold:
+                                q.append([i, j])
+                                seeds[i, j] = 0
+                                done[i, j] = 1
+                                mask[i, j] = 1
+        if np.sum(mask) > significant_number_of_points:
+            masks.append(mask)
+    return masks
+
+
+def check_region_growing(path="falling balls and cylinder", number_of_frames=5, depth_threshold=0.05,
+                         significant_number_of_points=100):
+    """Comparing region_growing made by label_regions with per-pixel region growing on masks of dataset
+
+    Seeds are moving pixels of FrameDifference and Fast_RGBD_MoG, so regions are grown from both small and large
+    masks. Regions must be the same and in the same order.
+    """
+    import moving_detection
+
+    rgb, depth = load_frames(path, range(number_of_frames))
+    frame_difference = moving_detection.FrameDifference(depth[0] / 255, rgb[0] / 255)
+    mog = moving_detection.Fast_RGBD_MoG(rgb[0], depth[0])
+    for i in range(1, number_of_frames):
+        current_depth = depth[i] / 255
+        movement_masks = {"FrameDifference": np.copy(frame_difference.process(rgb[i] / 255, current_depth)),
+                          "Fast_RGBD_MoG": mog.get_mask(rgb[i], depth[i]) / 255}
+        for name, movement_mask in movement_masks.items():
+            start = time.time()
+            reference = region_growing_per_pixel(movement_mask, current_depth, depth_threshold,
+                                                 significant_number_of_points)
+            per_pixel_time = time.time() - start
+            start = time.time()
+            masks = moving_detection.region_growing(movement_mask, current_depth, depth_threshold,
+                                                    significant_number_of_points)
+            labels_time = time.time() - start
+            compare_arrays("regions of " + name + " in frame " + str(i), masks, reference)
+            print("frame", i, name, "seeds:", np.count_nonzero(movement_mask), "regions:", len(masks),
+                  "per-pixel:", per_pixel_time, "labels:", labels_time)
+
+
+def check_objects_from_labels(path="falling balls and cylinder", significant_number_of_points=20):
+    """Comparing point clouds of moving regions made in one pass with the ones made from every region mask
+
+    Clouds are also made for one label fewer than there are regions, points of the last label mustn't get into them.
+    """
+    import moving_detection
+
+    rgb, depth = load_frames(path, range(5))
+    mog = moving_detection.Fast_RGBD_MoG(rgb[0], depth[0])
+    for i in range(5):
+        mask = mog.get_mask(rgb[i], depth[i])
+        labels, regions = moving_detection.label_regions(mask / 255, depth[i] / 255,
+                                                         significant_number_of_points=significant_number_of_points)
+        start = time.time()
+        reference = [image_processing.calculate_point_cloud(rgb[i] / 255, depth[i] * region_mask / 255) for
+                     region_mask in moving_detection.region_masks(labels, regions)]
+        masks_time = time.time() - start
+        start = time.time()
+        clouds = image_processing.labelled_point_clouds(rgb[i], depth[i], labels, image_scale=255)
+        labels_time = time.time() - start
+        fewer_clouds = image_processing.labelled_point_clouds(rgb[i], depth[i], labels, max(len(regions) - 1, 0),
+                                                              image_scale=255)
+        compare_arrays("point clouds in frame " + str(i), clouds, reference)
+        compare_arrays("point clouds of fewer labels in frame " + str(i), fewer_clouds, reference[:-1])
+        print("frame", i, "regions:", len(regions), "masks:", masks_time, "labels:", labels_time)
+
+    objects = image_processing.objects_from_labels(rgb[-1], depth[-1], labels, regions, image_scale=255)
+    visualization.visualize_object(objects)
+
+
+def check_point_cloud_precision(path="falling balls and cylinder", number_of_repeats=30, max_error=1e-5):
+    """Comparing time and points of calculate_point_cloud in float64 and float32 with preallocated output
+
+    max_error is the largest difference of coordinates in float32, which is allowed.
+    """
+    rgb, depth = load_frames(path, [2])
+    rgb_im, depth_im = rgb[0] / 255, depth[0] / 255
+    for dtype in (np.float64, np.float32):
+        out = np.empty((depth_im.size, 3), dtype=dtype)
+        start = time.time()
+        for _ in range(number_of_repeats):
+            xyz, rgb = image_processing.calculate_point_cloud(rgb_im, depth_im, out=out, dtype=dtype)
+        print(np.dtype(dtype).name, "time:", (time.time() - start) / number_of_repeats, "points:", xyz.shape[0])
+        if dtype is np.float64:
+            reference = np.copy(xyz)
+        else:
+            print("largest difference:", compare_arrays("points in float32", xyz, reference, max_error))
+
+
+def check_subsampled_point_cloud(path="falling balls and cylinder", steps=(1, 2, 4), number_of_points=1000):
+    """Checking that subsampled and organized point clouds are the parts of the whole organized point cloud"""
+    rgb, depth = load_frames(path, [2])
+    rgb_im, depth_im = rgb[0] / 255, depth[0] / 255
+    organized_xyz, _ = image_processing.calculate_point_cloud(rgb_im, depth_im, organized=True)
+    for step in steps:
+        xyz, rgb = image_processing.calculate_point_cloud(rgb_im, depth_im, step=step)
+        subsampled_xyz = organized_xyz[::step, ::step].reshape(-1, 3)
+        compare_arrays("points for step " + str(step), xyz,
+                       subsampled_xyz[np.logical_not(np.isnan(subsampled_xyz[:, 0]))])
+        print("step", step, "points:", xyz.shape[0])
+    xyz, rgb = image_processing.calculate_point_cloud(rgb_im, depth_im, number_of_points=number_of_points,
+                                                      organized=True)
+    assert xyz.shape[0] * xyz.shape[1] <= number_of_points, "grid " + str(xyz.shape[:2]) + " is over the budget"
+    print("budget", number_of_points, "grid:", xyz.shape[:2], "points:", np.count_nonzero(~np.isnan(xyz[:, :, 0])))
+
+
+def check_grid_normals(path="falling balls and cylinder", distance_threshold=0.05, radius=0.1, least_cosine=0.95):
+    """Comparing time and directions of normals found by image grid with the ones found by KD-tree in PointsObject
+
+    least_cosine is the least mean cosine of angles between normals, which is allowed.
+    """
+    rgb, depth = load_frames(path, [2])
+    rgb_im, depth_im = rgb[0] / 255, depth[0] / 255
+    center_of_view = np.zeros(3)
+
+    start = time.time()
+    xyz, rgb, normals = image_processing.calculate_point_cloud_with_normals(rgb_im, depth_im, center_of_view,
+                                                                            distance_threshold)
+    print("grid normals:", time.time() - start)
+    start = time.time()
+    kd_tree_object = PointsObject(xyz, rgb, center_of_view, radius)
+    print("KD-tree normals:", time.time() - start)
+    start = time.time()
+    grid_object = PointsObject(xyz, rgb, center_of_view, radius, normals=normals)
+    print("PointsObject with grid normals:", time.time() - start)
+
+    cosines = np.sum(grid_object.get_normals() * kd_tree_object.get_normals(), axis=1)
+    print("mean cosine:", np.mean(cosines), "cosines less than 0.9:", np.mean(cosines < 0.9))
+    assert np.mean(cosines) >= least_cosine, "mean cosine " + str(np.mean(cosines)) + ", " + str(least_cosine) + \
+        " is allowed"
+
+
+def check_frame_recording(path="falling balls and cylinder", file_name="frames.rec", number_of_repeats=20):
+    """Comparing frames of recording with png images of dataset and time of reading them"""
+    import frame_recording
+
+    frame_recording.convert_image_sequence(path, file_name)
+    recording = frame_recording.Recording(file_name)
+    rgb_images, depth_images = load_frames(path, range(len(recording)))
+    for i, (rgb, depth) in enumerate(recording):
+        compare_arrays("rgb in frame " + str(i), rgb, rgb_images[i])
+        compare_arrays("depth in frame " + str(i), depth // 257, depth_images[i])
+
+    start = time.time()
+    for _ in range(number_of_repeats):
+        for i in range(len(recording)):
+            recording.get_frame(i, normalize=True)
+    print("recording:", (time.time() - start) / number_of_repeats / len(recording))
+    start = time.time()
+    for _ in range(number_of_repeats):
+        for i in range(len(recording)):
+            image_processing.load_image(path, "rgb_" + str(i) + ".png") / 255
+            image_processing.load_image(path, "depth_" + str(i) + ".png", "depth") / 255
+    print("png:", (time.time() - start) / number_of_repeats / len(recording))
+
+
 def check_RANSAC():
     ball = download_point_cloud.download_to_object("preDiploma_PC/box.pcd")
     full_model = ball
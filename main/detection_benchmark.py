@@ -0,0 +1,256 @@
+import os
+import sys
+import json
+import time
+import platform
+import warnings
+import tracemalloc
+import numpy as np
+
+import image_processing
+import moving_detection
+from moving_detection import create_detector
+
+DATASETS = ["falling ball", "falling ball and cube", "falling balls and cylinder", "falling ball 64x2_48x2"]
+
+# name: (class, parameters, True if detector works with images in [0, 1]); names are folders of Results
+# random detectors are seeded and work in batch mode, so scores of reports are comparable
+DETECTORS = {"Frame difference": (moving_detection.FrameDifference, {"rgb_threshold": 0.3, "depth_threshold": 0.005},
+                                  True),
+             "ViBE": (moving_detection.ViBЕ, {"number_of_samples": 10, "threshold_r": 20 / 255, "time_factor": 16,
+                                              "batch_mode": True, "seed": 0}, True),
+             "DEVB": (moving_detection.DEVB, {"number_of_samples": 10, "time_factor": 16, "batch_mode": True,
+                                              "seed": 0}, True),
+             "RGB MoG": (moving_detection.RGB_MoG, {"number_of_gaussians": 3}, False),
+             "RGBD MoG": (moving_detection.RGBD_MoG, {"number_of_gaussians": 3}, False),
+             "Fast RGBD MoG": (moving_detection.Fast_RGBD_MoG, {"number_of_gaussians": 3}, False)}
+
+# masks in Results were saved by try_* functions of "NIR 3 semester.py" on this dataset; they are earlier outputs of
+# detectors, not ground truth, so scores against them are agreement with stored masks, not accuracy
+RESULTS_DATASET = "falling balls and cylinder"
+# where every folder of Results came from; folders, which aren't here, aren't used as references
+REFERENCE_PROVENANCE = {
+    "Results/ViBE": "saved by try_ViBE before detectors were seeded, so random samples differ from seeded runs",
+    "Results/DEVB": "saved by try_DEVB before detectors were seeded, so random samples differ from seeded runs",
+    "Results/RGB MoG": "saved by try_RGB_MoG with number_of_gaussians=3",
+    "Results/RGBD MoG": "saved by an earlier version of try_RGBD_MoG, whose save_image is commented out now; the "
+                        "parameters of the run are unknown"}
+# masks of Results, which aren't masks of process, so detectors aren't compared with them
+UNCOMPARABLE_RESULTS = {"Frame difference": "masks of Results are regions grown by FrameDifference.create_mask"}
+
+PERCENTILES = [50, 90, 99]
+
+
+def load_frames(path, number_of_frames=5):
+    """Loading rgb and depth images of dataset
+
+    Return:
+        rgb, depth (list): images as they are loaded, rgb is [height, width, 3], depth is [height, width]
+    """
+    with image_processing.ImageSequence(path, number_of_frames) as sequence:
+        rgb, depth = map(list, zip(*sequence))
+    return rgb, depth
+
+
+def load_reference_masks(dataset, detector_name, number_of_frames=5):
+    """Finding reference masks of dataset
+
+    Ground truth masks mask_<i>.png in the folder of dataset are used first. Otherwise, for the dataset of Results the
+    masks saved earlier by the same detector are used, so the score shows agreement with them and not accuracy.
+    Fast RGBD MoG has no masks of its own in Results, masks of UNCOMPARABLE_RESULTS aren't used.
+
+    Return:
+        masks (list): boolean masks of frames, None if there are no references
+        reference (str): folder of masks or the reason why there are no references
+        provenance (str): "ground truth" or where stored masks came from, None if there are no references
+    """
+    file_names = ["mask_" + str(i) + ".png" for i in range(number_of_frames)]
+    if all(os.path.exists(os.path.join(dataset, file_name)) for file_name in file_names):
+        return [image_processing.load_image(dataset, file_name, "depth") > 127 for file_name in file_names], dataset, \
+            "ground truth"
+    if dataset != RESULTS_DATASET:
+        return None, "no ground truth masks mask_<i>.png in " + dataset, None
+    if detector_name in UNCOMPARABLE_RESULTS:
+        return None, UNCOMPARABLE_RESULTS[detector_name], None
+
+    folder = "Results/" + detector_name
+    file_names = ["mask" + str(i) + ".png" for i in range(number_of_frames)]
+    if folder not in REFERENCE_PROVENANCE or \
+            not all(os.path.exists(os.path.join(folder, file_name)) for file_name in file_names):
+        return None, "no stored masks of " + detector_name + " in Results", None
+    return [image_processing.load_image(folder, file_name, "depth") > 127 for file_name in file_names], folder, \
+        REFERENCE_PROVENANCE[folder]
+
+
+def precision_recall(masks, reference_masks):
+    """Scoring masks against reference masks of all frames together
+
+    Precision and recall are accuracy only for ground truth masks, for stored masks of detectors they are agreement.
+
+    Return:
+        precision, recall (float): None if there are no found or no reference moving pixels
+    """
+    true_positive, found, expected = 0, 0, 0
+    for mask, reference_mask in zip(masks, reference_masks):
+        true_positive += np.count_nonzero(mask & reference_mask)
+        found += np.count_nonzero(mask)
+        expected += np.count_nonzero(reference_mask)
+    precision = true_positive / found if found else None
+    recall = true_positive / expected if expected else None
+    return precision, recall
+
+
+def latency_statistics(latencies):
+    """Statistics of frame latencies in seconds"""
+    statistics = {"mean": float(np.mean(latencies)), "max": float(np.max(latencies))}
+    for percentile in PERCENTILES:
+        statistics["p" + str(percentile)] = float(np.percentile(latencies, percentile))
+    return statistics
+
+
+def run_detector(detector_class, parameters, rgb, depth, number_of_repeats=1):
+    """Processing frames of dataset by new detector
+
+    Detector is created from the first frame, then all frames including the first are processed number_of_repeats times.
+
+    Return:
+        initialization_time (float): time of creating of detector in seconds
+        latencies (list): time of every processed frame in seconds
+        masks (list): boolean masks of the first pass over frames
+    """
+    start = time.perf_counter()
+    detector = create_detector(detector_class, rgb[0], depth[0], **parameters)
+    initialization_time = time.perf_counter() - start
+
+    latencies, masks = [], []
+    for repeat in range(number_of_repeats):
+        for rgb_im, depth_im in zip(rgb, depth):
+            start = time.perf_counter()
+            mask = detector.process(rgb_im, depth_im)
+            latencies.append(time.perf_counter() - start)
+            if repeat == 0:
+                masks.append(mask > 0)
+    return initialization_time, latencies, masks
+
+
+def peak_memory(detector_class, parameters, rgb, depth):
+    """Peak memory in bytes allocated while creating detector and processing frames once
+
+    Memory is traced separately from timing, because tracing slows allocations down.
+    """
+    tracemalloc.start()
+    detector = create_detector(detector_class, rgb[0], depth[0], **parameters)
+    for rgb_im, depth_im in zip(rgb, depth):
+        detector.process(rgb_im, depth_im)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def benchmark_detectors(datasets=None, detectors=None, number_of_frames=5, number_of_repeats=3, measure_memory=True):
+    """Running every detector over every dataset
+
+    Arguments:
+        datasets (list): folders of datasets, DATASETS if None
+        detectors (list): names of DETECTORS, all if None
+        number_of_frames (int): number of frames in every dataset
+        number_of_repeats (int): number of passes over frames for latency, only the first one is scored
+        measure_memory (bool): if True, peak memory is measured in an additional pass
+
+    Return:
+        report (dict): environment and results by dataset and detector name
+    """
+    if datasets is None:
+        datasets = DATASETS
+    if detectors is None:
+        detectors = list(DETECTORS)
+
+    report = {"time": time.strftime("%Y-%m-%d %H:%M:%S"), "python": platform.python_version(),
+              "numpy": np.__version__, "platform": platform.platform(), "number_of_frames": number_of_frames,
+              "number_of_repeats": number_of_repeats, "results": {}}
+    for dataset in datasets:
+        rgb, depth = load_frames(dataset, number_of_frames)
+        report["results"][dataset] = {}
+        for name in detectors:
+            detector_class, parameters, scaled = DETECTORS[name]
+            if scaled:
+                rgb_frames, depth_frames = [im / 255 for im in rgb], [im / 255 for im in depth]
+            else:
+                rgb_frames, depth_frames = rgb, depth
+
+            initialization_time, latencies, masks = run_detector(detector_class, parameters, rgb_frames,
+                                                                 depth_frames, number_of_repeats)
+            result = {"shape": list(rgb[0].shape[:2]), "initialization": initialization_time,
+                      "latency": latency_statistics(latencies), "fps": len(latencies) / float(np.sum(latencies)),
+                      "moving_pixels": [int(np.count_nonzero(mask)) for mask in masks]}
+            if measure_memory:
+                result["peak_memory"] = peak_memory(detector_class, parameters, rgb_frames, depth_frames)
+
+            reference_masks, reference, provenance = load_reference_masks(dataset, name, number_of_frames)
+            if reference_masks is None:
+                warnings.warn(dataset + " | " + name + " isn't scored: " + reference)
+                result["unscored"] = reference
+                scores = "unscored"
+            else:
+                precision, recall = precision_recall(masks, reference_masks)
+                score = "accuracy" if provenance == "ground truth" else "agreement_with_stored_masks"
+                result[score] = {"precision": precision, "recall": recall, "reference": reference,
+                                 "provenance": provenance}
+                scores = score + " | precision: " + str(precision) + " | recall: " + str(recall)
+
+            report["results"][dataset][name] = result
+            print(dataset, "|", name, "| initialization:", round(initialization_time, 4), "| p50:",
+                  round(result["latency"]["p50"], 4), "|", scores)
+    return report
+
+
+def save_report(report, file_name):
+    with open(file_name, "w") as file:
+        json.dump(report, file, indent=4)
+
+
+def load_report(file_name):
+    with open(file_name) as file:
+        return json.load(file)
+
+
+def compare_reports(previous, current, latency_tolerance=0.2, score_tolerance=0.01):
+    """Finding regressions of current report against previous one
+
+    Arguments:
+        previous, current (dict): reports of benchmark_detectors
+        latency_tolerance (float): allowed relative growth of median latency
+        score_tolerance (float): allowed decrease of precision and recall against the same references
+
+    Return:
+        regressions (list): descriptions of regressions
+    """
+    regressions = []
+    for dataset, results in current["results"].items():
+        for name, result in results.items():
+            if name not in previous["results"].get(dataset, {}):
+                continue
+            old_result = previous["results"][dataset][name]
+            if result["latency"]["p50"] > old_result["latency"]["p50"] * (1 + latency_tolerance):
+                regressions.append(dataset + " | " + name + " | p50 latency: " + str(old_result["latency"]["p50"]) +
+                                   " -> " + str(result["latency"]["p50"]))
+            for score in ("accuracy", "agreement_with_stored_masks"):
+                if score not in result or score not in old_result or \
+                        result[score]["reference"] != old_result[score]["reference"]:
+                    continue
+                for name_of_score in ("precision", "recall"):
+                    new_value, old_value = result[score][name_of_score], old_result[score][name_of_score]
+                    if new_value is not None and old_value is not None and new_value < old_value - score_tolerance:
+                        regressions.append(dataset + " | " + name + " | " + score + " " + name_of_score + ": " +
+                                           str(old_value) + " -> " + str(new_value))
+    return regressions
+
+
+if __name__ == "__main__":
+    # python detection_benchmark.py [report.json [previous_report.json]]
+    report_name = sys.argv[1] if len(sys.argv) > 1 else "detection_benchmark.json"
+    benchmark_report = benchmark_detectors()
+    save_report(benchmark_report, report_name)
+    if len(sys.argv) > 2:
+        for regression in compare_reports(load_report(sys.argv[2]), benchmark_report):
+            print("regression:", regression)
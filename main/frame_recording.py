@@ -0,0 +1,223 @@
+import os
+import json
+import time
+import numpy as np
+
+RECORDING_VERSION = 1
+RECORDING_SIGNATURE = b"RGBDREC\0"
+# header is padded to the size of memory page, so frames are mapped from aligned offset
+HEADER_ALIGNMENT = 4096
+DEPTH_SCALES = {"uint16": 65535., "float32": 1.}
+
+
+def frame_dtype(height, width, depth_dtype):
+    """Structured type of one frame in recording: timestamp, rgb and depth images"""
+    return np.dtype([("timestamp", "<f8"), ("rgb", "u1", (height, width, 3)),
+                     ("depth", np.dtype(depth_dtype).newbyteorder("<"), (height, width))], align=True)
+
+
+def convert_rgb(rgb):
+    """Rgb image in uint8; float images are in [0, 1]"""
+    if rgb.dtype == np.uint8:
+        return rgb
+    return np.round(np.clip(rgb, 0, 1) * 255).astype(np.uint8)
+
+
+def convert_depth(depth, depth_dtype):
+    """Depth image in the type of recording
+
+    uint8 images are in [0, 255], uint16 images are in [0, DEPTH_SCALES["uint16"]], float images are in [0, 1]. They
+    are scaled to [0, 1] and then to the scale of recording type.
+    """
+    depth_dtype = np.dtype(depth_dtype)
+    if depth_dtype.name not in DEPTH_SCALES:
+        raise ValueError("depth of recording can't be " + depth_dtype.name)
+    if depth.dtype == depth_dtype:
+        return depth
+    if depth.dtype == np.uint8:
+        depth = depth / 255
+    elif depth.dtype == np.uint16:
+        depth = depth / DEPTH_SCALES["uint16"]
+    elif not np.issubdtype(depth.dtype, np.floating):
+        raise ValueError("depth image can't be " + depth.dtype.name)
+
+    if depth_dtype == np.uint16:
+        return np.round(np.clip(depth, 0, 1) * DEPTH_SCALES["uint16"]).astype(np.uint16)
+    return depth.astype(np.float32)
+
+
+class RecordingWriter:
+    """Writer of rgb and depth frames into one binary file
+
+    File consists of header and frames of the same size. Header is a signature, length of JSON description as
+    little-endian uint64 and JSON description (version, resolution, type of depth) padded to HEADER_ALIGNMENT. Every
+    frame is a record of little-endian frame_dtype, so the file is read by np.memmap without decoding. Depth is kept
+    in uint16 (1 is 65535) or float32, not quantized to 8 bits as in png. Number of frames is found by the size of
+    file, so recording can be read while it is written, and a frame which wasn't written completely is ignored. Every
+    frame is flushed, so readers see it at once.
+
+    Attributes:
+        file_name (str): name of file
+        height, width (int): resolution of frames
+        depth_dtype (np.dtype): type of depth in file, uint16 or float32
+        number_of_frames (int): number of written frames
+        __file (file): opened file
+        __frame (np.ndarray): buffer for the next frame
+        __start (float): time of creating of recording, timestamps are counted from it by default
+    """
+
+    def __init__(self, file_name, height, width, depth_dtype=np.uint16, description=None):
+        self.file_name = file_name
+        self.height, self.width = height, width
+        self.depth_dtype = np.dtype(depth_dtype)
+        self.number_of_frames = 0
+
+        header = {"version": RECORDING_VERSION, "height": height, "width": width, "depth_dtype": self.depth_dtype.name,
+                  "description": description}
+        header = json.dumps(header).encode()
+        header_size = len(RECORDING_SIGNATURE) + 8 + len(header)
+        padding = -header_size % HEADER_ALIGNMENT
+
+        self.__file = open(file_name, "wb")
+        self.__file.write(RECORDING_SIGNATURE)
+        self.__file.write(np.array(len(header) + padding, dtype="<u8").tobytes())
+        self.__file.write(header + b" " * padding)
+
+        self.__frame = np.zeros((), dtype=frame_dtype(height, width, self.depth_dtype))
+        self.__start = time.time()
+
+    def write(self, rgb, depth, timestamp=None):
+        """Appending frame to recording
+
+        Arguments:
+            rgb (np.ndarray): rgb image, uint8 or float in [0, 1]
+            depth (np.ndarray): depth image, uint8 as loaded from png, float in [0, 1] or in the type of recording
+            timestamp (float): time of frame in seconds, time since creating of recording if None
+        """
+        self.__frame["timestamp"] = time.time() - self.__start if timestamp is None else timestamp
+        self.__frame["rgb"] = convert_rgb(rgb)
+        self.__frame["depth"] = convert_depth(depth, self.depth_dtype)
+        self.__file.write(self.__frame.tobytes())
+        self.__file.flush()
+        self.number_of_frames += 1
+
+    def close(self):
+        self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class Recording:
+    """Memory-mapped recording made by RecordingWriter
+
+    Frames are views of the mapped file, so random access needs no decoding and reads only the pages of the frame.
+    Recording may be read while RecordingWriter appends to it: frames written after opening are mapped by refresh,
+    which is called by len, iteration, frame_at and for frames out of the mapped ones.
+
+    Attributes:
+        file_name (str): name of file
+        header (dict): JSON description of recording
+        height, width (int): resolution of frames
+        depth_dtype (np.dtype): type of depth in file
+        frames (np.memmap): records of mapped frames, see frame_dtype
+        __offset (int): size of header in bytes
+    """
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        with open(file_name, "rb") as file:
+            signature = file.read(len(RECORDING_SIGNATURE))
+            header_length = int(np.frombuffer(file.read(8), dtype="<u8")[0])
+            self.header = json.loads(file.read(header_length).decode())
+        if signature != RECORDING_SIGNATURE or self.header["version"] != RECORDING_VERSION:
+            raise ValueError(file_name + " isn't a recording of version " + str(RECORDING_VERSION))
+
+        self.height, self.width = self.header["height"], self.header["width"]
+        self.depth_dtype = np.dtype(self.header["depth_dtype"])
+        self.__offset = len(RECORDING_SIGNATURE) + 8 + header_length
+        self.frames = np.zeros(0, dtype=frame_dtype(self.height, self.width, self.depth_dtype))
+        self.refresh()
+
+    def refresh(self):
+        """Mapping frames written since the last refresh
+
+        Return:
+            number_of_frames (int): number of complete frames in file
+        """
+        dtype = self.frames.dtype
+        number_of_frames = (os.path.getsize(self.file_name) - self.__offset) // dtype.itemsize
+        if number_of_frames != self.frames.shape[0]:
+            self.frames = np.memmap(self.file_name, dtype=dtype, mode="r", offset=self.__offset,
+                                    shape=(number_of_frames,)) if number_of_frames > 0 else np.zeros(0, dtype=dtype)
+        return number_of_frames
+
+    def __len__(self):
+        return self.refresh()
+
+    @property
+    def timestamps(self):
+        """Timestamps of mapped frames"""
+        return self.frames["timestamp"]
+
+    def get_frame(self, frame_number, normalize=False):
+        """Rgb and depth images of frame
+
+        Arguments:
+            frame_number (int): number of frame
+            normalize (bool): if True, images are float32 in [0, 1], otherwise they are read-only views of file
+
+        Return:
+            rgb (np.ndarray): rgb image, [height, width, 3]
+            depth (np.ndarray): depth image, [height, width]
+        """
+        if not -self.frames.shape[0] <= frame_number < self.frames.shape[0]:
+            number_of_frames = self.refresh()
+            if not -number_of_frames <= frame_number < number_of_frames:
+                raise IndexError("frame " + str(frame_number) + " isn't in " + self.file_name + " of " +
+                                 str(number_of_frames) + " frames")
+        frame = self.frames[frame_number]
+        if not normalize:
+            return frame["rgb"], frame["depth"]
+        return np.multiply(frame["rgb"], np.float32(1 / 255), dtype=np.float32), \
+            np.multiply(frame["depth"], np.float32(1 / DEPTH_SCALES[self.depth_dtype.name]), dtype=np.float32)
+
+    def __getitem__(self, frame_number):
+        return self.get_frame(frame_number)
+
+    def __iter__(self):
+        # frames written while iterating are read too
+        frame_number = 0
+        while frame_number < len(self):
+            yield self.get_frame(frame_number)
+            frame_number += 1
+
+    def frame_at(self, timestamp):
+        """Number of the last frame taken not later than timestamp"""
+        self.refresh()
+        return max(int(np.searchsorted(self.timestamps, timestamp, side="right")) - 1, 0)
+
+
+def convert_image_sequence(path, file_name, number_of_frames=None, depth_dtype=np.uint16, time_interval=0.):
+    """Converting dataset of "rgb_<i>.png" and "depth_<i>.png" into recording
+
+    Arguments:
+        path (str): folder of dataset
+        file_name (str): name of recording
+        number_of_frames (int): number of frames, all frames of folder if None
+        depth_dtype (np.dtype): type of depth in recording
+        time_interval (float): time between frames for timestamps
+    """
+    import image_processing
+
+    with image_processing.ImageSequence(path, number_of_frames) as sequence:
+        writer = None
+        for frame_number, (rgb, depth) in enumerate(sequence):
+            if writer is None:
+                writer = RecordingWriter(file_name, depth.shape[0], depth.shape[1], depth_dtype, path)
+            writer.write(rgb, depth, frame_number * time_interval)
+        if writer is not None:
+            writer.close()
@@ -2,11 +2,164 @@ import numpy as np
 from PIL import Image, ImageOps
 import os
 from math import radians, sin
+from functools import lru_cache
+import threading
 
 
-def calculate_point_cloud(rgb, depth, cam_angle=57., near_clipping_plane=0.2, far_clipping_plane=3.5, step=1):
+class CameraIntrinsics:
+    """Kinect properties with cached directions of rays of pixels
+
+    Ray of pixel is (tan of horizontal angle, tan of vertical angle, 1), so the point of pixel is its ray multiplied by
+    distance along the camera axis. Only every step-th pixel of every step-th row is back-projected, images are
+    subsampled before the calculation. Instances are shared by camera_intrinsics, so scratch arrays are kept for every
+    thread separately, and point clouds may be calculated in several threads at once.
+
+    Attributes:
+        step (int): step of subsampling of images
+        width, height (int): resolution of subsampled images
+        near_clipping_plane (float): distance to the nearest objects the camera sees
+        far_clipping_plane (float): distance to the farthest objects the camera sees
+        dtype (np.dtype): type of points
+        rays (np.ndarray): directions of rays of subsampled pixels, [height, width, 3]
+        __scratch (threading.local): scratch arrays of every thread, "distance" for distances along the camera axis,
+            [height, width], and "points" for points of the whole image, [height, width, 3]
+    """
+
+    def __init__(self, width, height, cam_angle=57., near_clipping_plane=0.2, far_clipping_plane=3.5,
+                 dtype=np.float64, step=1):
+        self.step = step
+        self.dtype = np.dtype(dtype)
+        self.near_clipping_plane = self.dtype.type(near_clipping_plane)
+        self.far_clipping_plane = self.dtype.type(far_clipping_plane)
+        self.__depth_amplitude = far_clipping_plane - near_clipping_plane
+
+        x_half_resolution, y_half_resolution = width / 2, height / 2
+        x_half_angle = radians(cam_angle) / 2.
+        y_half_angle = radians(cam_angle) / 2. * height / width
+        x_angles = (x_half_resolution - 0.5 - np.arange(width)) / x_half_resolution * x_half_angle
+        y_angles = (y_half_resolution - 0.5 - np.arange(height)) / y_half_resolution * y_half_angle
+        xx_angles, yy_angles = np.meshgrid(x_angles[::step], y_angles[::step])
+
+        self.height, self.width = xx_angles.shape
+        self.rays = np.ones((self.height, self.width, 3), dtype=self.dtype)
+        self.rays[:, :, 0] = np.tan(xx_angles)
+        self.rays[:, :, 1] = np.tan(yy_angles)
+
+        self.__scratch = threading.local()
+
+    def scratch(self):
+        """Scratch arrays of the current thread, they are made on the first call in the thread
+
+        Return:
+            distance (np.ndarray): array for distances, [height, width]
+            points (np.ndarray): array for points, [height, width, 3]
+        """
+        scratch = self.__scratch
+        if not hasattr(scratch, "distance"):
+            scratch.distance = np.empty((self.height, self.width), dtype=self.dtype)
+            scratch.points = np.empty((self.height, self.width, 3), dtype=self.dtype)
+        return scratch.distance, scratch.points
+
+    def subsample(self, image):
+        """View of every step-th pixel of every step-th row of image"""
+        return image[::self.step, ::self.step]
+
+    def distance(self, depth, out=None):
+        """Distances along the camera axis
+
+        Arguments:
+            depth (np.ndarray): array contains depth values in [0, 1] of the whole image
+            out (np.ndarray): array for distances, [height, width]
+
+        Return:
+            distance (np.ndarray): distances of subsampled pixels, [height, width]
+        """
+        if out is None:
+            out = np.empty((self.height, self.width), dtype=self.dtype)
+        np.multiply(self.subsample(depth), self.__depth_amplitude, out=out)
+        np.add(out, self.near_clipping_plane, out=out)
+        return out
+
+    def reliable(self, distance):
+        """Mask of distances between clipping planes"""
+        return np.logical_and(distance > self.near_clipping_plane, distance < self.far_clipping_plane)
+
+    def back_projection(self, depth, out=None):
+        """Points of all subsampled pixels of image
+
+        Arguments:
+            depth (np.ndarray): array contains depth values in [0, 1] of the whole image
+            out (np.ndarray): array for points, [height, width, 3]
+
+        Return:
+            points (np.ndarray): points of pixels, [height, width, 3]
+        """
+        if out is None:
+            out = np.empty((self.height, self.width, 3), dtype=self.dtype)
+        distance = self.distance(depth, self.scratch()[0])
+        return np.multiply(self.rays, distance[:, :, np.newaxis], out=out)
+
+    def point_cloud(self, rgb, depth, out=None, organized=False):
+        """Points of subsampled pixels with reliable depth
+
+        Arguments:
+            rgb (np.ndarray): array contains colors of point cloud of the whole image
+            depth (np.ndarray): array contains depth values in [0, 1] of the whole image
+            out (np.ndarray): array for coordinates of points with at least height * width rows, or [height, width, 3]
+                if organized
+            organized (bool): if True, points keep the layout of subsampled image, points without reliable depth are
+                NaN
+
+        Return:
+            xyz (np.ndarray): coordinates of points, a view of out if it was given
+            rgb (np.ndarray): colors of points, a view of subsampled rgb if organized
+        """
+        # back_projection leaves distances in the scratch of the thread
+        distance, points = self.scratch()
+        if organized:
+            xyz = self.back_projection(depth, out)
+            xyz[np.logical_not(self.reliable(distance))] = np.nan
+            return xyz, self.subsample(rgb)
+
+        points = self.back_projection(depth, points).reshape(self.height * self.width, 3)
+        reliable_depth = self.reliable(distance).reshape(self.height * self.width)
+        if out is not None:
+            out = out[:np.count_nonzero(reliable_depth)]
+        xyz = np.compress(reliable_depth, points, axis=0, out=out)
+        return xyz, self.subsample(rgb).reshape(self.height * self.width, 3)[reliable_depth]
+
+
+def camera_intrinsics(width, height, cam_angle=57., near_clipping_plane=0.2, far_clipping_plane=3.5,
+                      dtype=np.float64, step=1):
+    """CameraIntrinsics shared by all images of the same resolution, kinect properties and step
+
+    Arguments are passed to the cache in one form, so e.g. np.float64 and np.dtype("float64") or default and explicit
+    arguments give the same instance.
+    """
+    return cached_camera_intrinsics(width, height, cam_angle, near_clipping_plane, far_clipping_plane, np.dtype(dtype),
+                                    step)
+
+
+@lru_cache(maxsize=8)
+def cached_camera_intrinsics(width, height, cam_angle, near_clipping_plane, far_clipping_plane, dtype, step):
+    return CameraIntrinsics(width, height, cam_angle, near_clipping_plane, far_clipping_plane, dtype, step)
+
+
+def step_for_number_of_points(width, height, number_of_points):
+    """The least step of subsampling which leaves no more than number_of_points pixels of image"""
+    step = max(int(np.sqrt(width * height / number_of_points)), 1)
+    while -(-width // step) * -(-height // step) > number_of_points:
+        step += 1
+    return step
+
+
+def calculate_point_cloud(rgb, depth, cam_angle=57., near_clipping_plane=0.2, far_clipping_plane=3.5, step=1,
+                          out=None, dtype=np.float64, number_of_points=None, organized=False):
     """Calculation of point cloud from images arrays and kinect properties
 
+    Images are subsampled by step before the calculation. Directions of rays are cached for every resolution, kinect
+    properties and step, see camera_intrinsics.
+
     Arguments:
         rgb (float array): array contains colors of point cloud
         depth (float array): array contains depth values
@@ -14,45 +167,191 @@ def calculate_point_cloud(rgb, depth, cam_angle=57., near_clipping_plane=0.2, fa
         near_clipping_plane (float): distance to the nearest objects the camera sees
         far_clipping_plane (float): distance to the farthest objects the camera sees
         step (int): step for the cycle; use to reduce the number of returning points
+        out (numpy.array): array for coordinates of points, see CameraIntrinsics.point_cloud
+        dtype (numpy.dtype): type of coordinates, np.float32 halves the memory traffic
+        number_of_points (int): the largest number of subsampled pixels, step is chosen for it if it isn't None
+        organized (bool): if True, points are returned as [height, width, 3] arrays of subsampled image, points
+            without reliable depth are NaN
 
     Returns:
         numpy.array 1: coordinates of points
         numpy.array 2: color of points
     """
+    if number_of_points is not None:
+        step = step_for_number_of_points(depth.shape[1], depth.shape[0], number_of_points)
+    intrinsics = camera_intrinsics(depth.shape[1], depth.shape[0], cam_angle, near_clipping_plane,
+                                   far_clipping_plane, dtype, step)
+    return intrinsics.point_cloud(rgb, depth, out, organized)
+
+
+def grid_differences(xyz, axis, distance_threshold=None):
+    """Differences between neighbours of every point of organized point cloud along one axis of image
+
+    Difference between the next and the previous neighbours is used, if one of them isn't reliable the point itself is
+    used instead of it. Neighbour is reliable if it has a point and is closer than distance_threshold along the camera
+    axis. It is found as the sum of differences of reliable pairs of neighbour pixels on both sides of the point.
+
+    Arguments:
+        xyz (np.ndarray): organized point cloud, [height, width, 3], NaN for points without depth
+        axis (int): 0 for vertical neighbours, 1 for horizontal ones
+        distance_threshold (float): the largest difference of distances of neighbours, no limit if None
+
+    Return:
+        differences (np.ndarray): differences, [height, width, 3], zeros if there are no reliable neighbours
+    """
+    following, previous = [slice(None)] * 3, [slice(None)] * 3
+    following[axis], previous[axis] = slice(1, None), slice(0, -1)
+    following, previous = tuple(following), tuple(previous)
+
+    pairs = xyz[following] - xyz[previous]
+    with np.errstate(invalid="ignore"):
+        unreliable = np.isnan(pairs[:, :, 2]) if distance_threshold is None else \
+            np.logical_not(np.abs(pairs[:, :, 2]) < distance_threshold)
+    np.copyto(pairs, 0, where=unreliable[:, :, np.newaxis])
+
+    differences = np.zeros_like(xyz)
+    differences[previous] += pairs
+    differences[following] += pairs
+    return differences
+
+
+def grid_normals(xyz, center_of_view=None, distance_threshold=None):
+    """Estimation of normals of organized point cloud by its neighbours in image
+
+    Normal is the cross product of differences between vertical and horizontal neighbours, see grid_differences. It
+    needs no search of neighbours, so it is much faster than estimation by KD-tree, but works only with point clouds
+    made by calculate_point_cloud with organized=True.
+
+    Arguments:
+        xyz (np.ndarray): organized point cloud, [height, width, 3], NaN for points without depth
+        center_of_view (np.ndarray): if it isn't None, normals are turned to this point as in
+            PointsObject.get_positive_normals; otherwise they are turned to the camera for flat surfaces
+        distance_threshold (float): the largest difference of distances of neighbours, which are on the same surface
+
+    Return:
+        normals (np.ndarray): unit normals, [height, width, 3], NaN if normal can't be found
+    """
+    vertical = grid_differences(xyz, 0, distance_threshold)
+    horizontal = grid_differences(xyz, 1, distance_threshold)
+    normals = np.cross(vertical, horizontal)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        normals /= np.sqrt(np.einsum("ijk,ijk->ij", normals, normals))[:, :, np.newaxis]
+        if center_of_view is not None:
+            normals[np.einsum("ijk,ijk->ij", normals, np.asarray(center_of_view) - xyz) < 0] *= -1
+    return normals
+
+
+def calculate_point_cloud_with_normals(rgb, depth, center_of_view=None, distance_threshold=None, **parameters):
+    """Calculation of point cloud and its normals by the grid of image
+
+    Arguments:
+        rgb (float array): array contains colors of point cloud
+        depth (float array): array contains depth values
+        center_of_view (np.ndarray): point to which normals are turned, see grid_normals
+        distance_threshold (float): the largest difference of distances of neighbours, see grid_normals
+        parameters: parameters of calculate_point_cloud except organized
+
+    Returns:
+        numpy.array 1: coordinates of points
+        numpy.array 2: color of points
+        numpy.array 3: normals of points, points without normals aren't returned
+    """
+    xyz, rgb = calculate_point_cloud(rgb, depth, organized=True, **parameters)
+    normals = grid_normals(xyz, center_of_view, distance_threshold)
+    found = np.logical_not(np.logical_or(np.isnan(xyz[:, :, 2]), np.isnan(normals[:, :, 2])))
+    return xyz[found], rgb[found], normals[found]
+
+
+def labelled_point_clouds(rgb, depth, labels, number_of_labels=None, cam_angle=57., near_clipping_plane=0.2,
+                          far_clipping_plane=3.5, image_scale=1.):
+    """Calculation of point clouds of labelled regions in one pass
+
+    Only labelled pixels are back-projected; the points of every label are the same as calculate_point_cloud gives for
+    depth multiplied by the mask of this label.
+
+    Arguments:
+        rgb (np.ndarray): array contains colors of point cloud
+        depth (np.ndarray): array contains depth values
+        labels (np.ndarray): image of labels, 0 is for pixels out of regions, see moving_detection.label_regions
+        number_of_labels (int): number of labels, the largest label if None; pixels of larger labels are skipped
+        cam_angle (float): angle of camera view
+        near_clipping_plane (float): distance to the nearest objects the camera sees
+        far_clipping_plane (float): distance to the farthest objects the camera sees
+        image_scale (float): value of rgb and depth which means 1, 255 for images as they are loaded
+
+    Returns:
+        list: coordinates and colors of points for labels from 1 to number_of_labels
+    """
+    if number_of_labels is None:
+        number_of_labels = int(labels.max())
+    if number_of_labels == 0:
+        return []
+    height, width = labels.shape
+
+    pixels = np.flatnonzero(np.logical_and(labels > 0, labels <= number_of_labels))
+    pixel_labels = labels.reshape(-1)[pixels]
+    # stable sorting keeps the order of pixels of calculate_point_cloud inside every label
+    order = np.argsort(pixel_labels, kind="stable")
+    pixels, pixel_labels = pixels[order], pixel_labels[order]
 
     depth_amplitude = far_clipping_plane - near_clipping_plane
-    x_resolution, y_resolution = depth.shape[1], depth.shape[0]
-    x_half_resolution, y_half_resolution = x_resolution / 2, y_resolution / 2
-    x_half_angle = radians(cam_angle) / 2.
-    y_half_angle = radians(cam_angle) / 2. * y_resolution / x_resolution
+    z = near_clipping_plane + depth_amplitude * (depth.reshape(-1)[pixels] / image_scale)
+    reliable_depth = np.logical_and(z > near_clipping_plane, z < far_clipping_plane)
+    pixels, pixel_labels, z = pixels[reliable_depth], pixel_labels[reliable_depth], z[reliable_depth]
 
-    xyz = np.zeros((y_resolution, x_resolution, 3))
+    rays = camera_intrinsics(width, height, cam_angle, near_clipping_plane, far_clipping_plane).rays
+    rows, columns = np.divmod(pixels, width)
+    xyz = np.empty((pixels.size, 3))
+    xyz[:, 2] = z
+    xyz[:, 0] = rays[0, columns, 0] * z
+    xyz[:, 1] = rays[rows, 0, 1] * z
+    colors = rgb.reshape(-1, 3)[pixels] / image_scale
 
-    x_angles = (x_half_resolution - 0.5 - np.arange(x_resolution)) / x_half_resolution * x_half_angle
-    y_angles = (y_half_resolution - 0.5 - np.arange(y_resolution)) / y_half_resolution * y_half_angle
-    xx_angles, yy_angles = np.meshgrid(x_angles, y_angles)
+    bounds = np.cumsum(np.bincount(pixel_labels, minlength=number_of_labels + 1)[1:number_of_labels + 1])[:-1]
+    return list(zip(np.split(xyz, bounds), np.split(colors, bounds)))
 
-    xyz[:, :, 2] = near_clipping_plane + depth_amplitude * depth
-    xyz[:, :, 0] = np.tan(xx_angles) * xyz[:, :, 2]
-    xyz[:, :, 1] = np.tan(yy_angles) * xyz[:, :, 2]
 
-    xyz = xyz.reshape(y_resolution * x_resolution, 3)
-    rgb = rgb.reshape(y_resolution * x_resolution, 3)
+def objects_from_labels(rgb, depth, labels, regions=None, number=None, camera_position=None, radius_for_normals=0.2,
+                        **parameters):
+    """Making point cloud object of every moving region
 
-    reliable_depth = np.logical_and(xyz[:, 2] > near_clipping_plane, xyz[:, 2] < far_clipping_plane)
+    Arguments:
+        rgb (np.ndarray): array contains colors of point cloud
+        depth (np.ndarray): array contains depth values
+        labels (np.ndarray): image of labels made by moving_detection.label_regions
+        regions (list): regions made by moving_detection.label_regions, every label of labels if None
+        number (int): number of active points of every object, all points if None
+        camera_position (np.ndarray): point of view from camera for normals
+        radius_for_normals (float): radius of searching neighbourhood points for normals
+        parameters: parameters of labelled_point_clouds
 
-    return xyz[reliable_depth], rgb[reliable_depth]
+    Returns:
+        list: PointsObject of every region, regions without reliable depth are skipped
+    """
+    from points_object import PointsObject
+
+    clouds = labelled_point_clouds(rgb, depth, labels, **parameters)
+    labels_of_objects = range(1, len(clouds) + 1) if regions is None else [region.label for region in regions]
+
+    objects = []
+    for label in labels_of_objects:
+        xyz, colors = clouds[label - 1]
+        if xyz.shape[0] > 0:
+            objects.append(PointsObject(xyz, colors, camera_position, radius_for_normals,
+                                        None if number is None else min(number, xyz.shape[0])))
+    return objects
 #
 #
 # def create_3d_data_grid(xyz, d_x, observation_vector=np.asarray([0, 1, 0]), cam_angle=57.,
 #                         x_resolution, y_resolution):
 
 
-def create_dataset_from_vrep(number_of_frames, time_interval=0, resolution_x=640, resolution_y=480, path_to_images=""):
+def create_dataset_from_vrep(number_of_frames, time_interval=0, resolution_x=640, resolution_y=480, path_to_images="",
+                             recording_name=None, depth_dtype=np.uint16):
     """Creating dataset
 
     Dataset consists of images which were taken from vrep scene. Saves them in format "depth_number.png" and
-    "rgb_number.png".
+    "rgb_number.png", or into one recording of frame_recording with timestamps and depth of full precision.
 
     Arguments:
         number_of_frames (int): number of frames to create for dataset
@@ -60,14 +359,21 @@ def create_dataset_from_vrep(number_of_frames, time_interval=0, resolution_x=640
         resolution_x (int): horizontal resolution of frames for dataset
         resolution_y (int): vertical resolution of frames for dataset
         path_to_images (string): path for folder where images will be stored
+        recording_name (string): name of recording file in path_to_images, png images are saved if None
+        depth_dtype (np.dtype): type of depth in recording, np.uint16 or np.float32
     """
     import vrep_functions
     import os
     import time
+    from frame_recording import RecordingWriter
 
     frame_number = 0
     if not os.path.exists(path_to_images):
         os.mkdir(path_to_images)
+    recording = None
+    if recording_name is not None:
+        recording = RecordingWriter(os.path.join(path_to_images, recording_name), resolution_y, resolution_x,
+                                    depth_dtype, "vrep")
 
     client_id = vrep_functions.vrep_connection()
     kinect_rgb_id = vrep_functions.get_object_id(client_id, 'kinect_rgb')
@@ -81,13 +387,18 @@ def create_dataset_from_vrep(number_of_frames, time_interval=0, resolution_x=640
     for i in range(number_of_frames):
         start = time.time()
         depth, rgb = vrep_functions.vrep_get_kinect_images(client_id, kinect_rgb_id, kinect_depth_id)
-        save_image(depth, path_to_images, frame_number, "depth_")
-        save_image(rgb, path_to_images, frame_number, "rgb_")
+        if recording is None:
+            save_image(depth, path_to_images, frame_number, "depth_")
+            save_image(rgb, path_to_images, frame_number, "rgb_")
+        else:
+            recording.write(rgb, depth)
         frame_number += 1
         while time.time() - start < time_interval:
             pass
 
     vrep_functions.vrep_stop_sim(client_id)
+    if recording is not None:
+        recording.close()
 
 
 def save_image(input_image, path_to_image, frame_number=0, image_name="unknown"):
@@ -114,13 +425,119 @@ def load_image(path_to_image, name_of_image, mode="RGB"):
 
     if mode == "RGB":
         img = cv2.imread(path_to_image + "/" + name_of_image)
-        img[:, :, 0], img[:, :, 2] = np.copy(img[:, :, 2]), np.copy(img[:, :, 0])
+        # channels are swapped in place
+        img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB, dst=img)
     else:
         img = cv2.imread(path_to_image + "/" + name_of_image, 0)
 
     return img
 
 
+def normalize_image(image):
+    """Image in float32 divided by 255"""
+    return np.multiply(image, np.float32(1 / 255), dtype=np.float32)
+
+
+class ImageSequence:
+    """Reader of frames "rgb_<i>.png" and "depth_<i>.png" of dataset folder
+
+    Frames are decoded ahead on a thread pool (cv2 releases GIL while decoding) and are yielded in order as (rgb, depth)
+    by iterator. Decoded frames can be kept in LRU cache, then cached arrays are shared by all readers of the frame and
+    mustn't be changed.
+
+    Attributes:
+        path (str): folder of dataset
+        number_of_frames (int): number of frames
+        normalize (bool): if True, images are float32 in [0, 1], otherwise they are uint8 as from load_image
+        __prefetch (int): number of frames which are decoded ahead
+        __executor (ThreadPoolExecutor): pool of decoding threads
+        __cache (OrderedDict): decoded frames by number, the least recently used first
+        __cache_size (int): the largest number of cached frames
+        __lock (threading.Lock): lock of cache
+    """
+
+    def __init__(self, path, number_of_frames=None, prefetch=4, number_of_threads=None, normalize=False,
+                 cache_size=0):
+        from collections import OrderedDict
+        from concurrent.futures import ThreadPoolExecutor
+        from threading import Lock
+
+        self.path = path
+        if number_of_frames is None:
+            number_of_frames = 0
+            while os.path.exists(os.path.join(path, "rgb_" + str(number_of_frames) + ".png")):
+                number_of_frames += 1
+        self.number_of_frames = number_of_frames
+        self.normalize = normalize
+
+        self.__prefetch = max(prefetch, 1)
+        self.__executor = ThreadPoolExecutor(number_of_threads if number_of_threads is not None else self.__prefetch)
+        self.__cache = OrderedDict()
+        self.__cache_size = cache_size
+        self.__lock = Lock()
+
+    def __len__(self):
+        return self.number_of_frames
+
+    def decode(self, frame_number):
+        """Decoding rgb and depth images of frame"""
+        rgb = load_image(self.path, "rgb_" + str(frame_number) + ".png")
+        depth = load_image(self.path, "depth_" + str(frame_number) + ".png", "depth")
+        if self.normalize:
+            rgb, depth = normalize_image(rgb), normalize_image(depth)
+        return rgb, depth
+
+    def cached(self, frame_number):
+        """Frame from cache, None if it isn't cached"""
+        with self.__lock:
+            frame = self.__cache.get(frame_number)
+            if frame is not None:
+                self.__cache.move_to_end(frame_number)
+            return frame
+
+    def remember(self, frame_number, frame):
+        if self.__cache_size <= 0:
+            return
+        with self.__lock:
+            self.__cache[frame_number] = frame
+            self.__cache.move_to_end(frame_number)
+            while len(self.__cache) > self.__cache_size:
+                self.__cache.popitem(last=False)
+
+    def load_frame(self, frame_number):
+        frame = self.cached(frame_number)
+        if frame is None:
+            frame = self.decode(frame_number)
+            self.remember(frame_number, frame)
+        return frame
+
+    def __getitem__(self, frame_number):
+        if not 0 <= frame_number < self.number_of_frames:
+            raise IndexError("frame " + str(frame_number) + " is out of sequence")
+        return self.load_frame(frame_number)
+
+    def __iter__(self):
+        from collections import deque
+
+        frames = deque()
+        for frame_number in range(self.number_of_frames):
+            frames.append(self.__executor.submit(self.load_frame, frame_number))
+            if len(frames) >= self.__prefetch:
+                yield frames.popleft().result()
+        while frames:
+            yield frames.popleft().result()
+
+    def close(self):
+        """Stopping decoding threads"""
+        self.__executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
 if __name__ == "__main__":
     # create_dataset_from_vrep(5, time_interval=0.5, resolution_x=64 * 2, resolution_y=48 * 2,
     #                          path_to_images="falling balls and cylinder")
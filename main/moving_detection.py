@@ -1,9 +1,12 @@
 import numpy as np
-import math
+import json
 import random
-from collections import deque
 from dataclasses import dataclass
 
+CHECKPOINT_VERSION = 1
+GAUSSIAN_PARAMETERS = ["luminance_mean", "color_mean", "depth_mean", "luminance_variance", "color_variance",
+                       "depth_variance", "weight", "ranking", "depth_observations"]
+
 
 @dataclass
 class RGB:
@@ -26,6 +29,113 @@ class Gaussian:
     depth_observations: np.ndarray = np.asarray([])
 
 
+@dataclass
+class Region:
+    label: int
+    number_of_points: int
+    bbox: tuple
+    mean_depth: float
+
+
+class FrameBuffer:
+    """Ring buffer of two preallocated frames: previous and current
+
+    Attributes:
+        __frames (list): two arrays for frames
+        __index (int): index of the current frame
+    """
+
+    def __init__(self, image):
+        frames = np.empty((2,) + image.shape, dtype=image.dtype)
+        self.__frames = [frames[0], frames[1]]
+        self.__index = 0
+        np.copyto(self.__frames[0], image)
+
+    def push(self, image, current=None):
+        """Copying new frame in place of the previous one
+
+        Arguments:
+            image (np.ndarray): new frame
+            current (np.ndarray): frame which is current for detector; it is copied to the buffer if it isn't there
+
+        Return:
+            previous, current (np.ndarray): previous and new frames in buffer
+        """
+        previous_index, self.__index = self.__index, 1 - self.__index
+        if current is not None and current is not self.__frames[previous_index]:
+            np.copyto(self.__frames[previous_index], current)
+        np.copyto(self.__frames[self.__index], image)
+        return self.__frames[previous_index], self.__frames[self.__index]
+
+    @property
+    def current(self):
+        return self.__frames[self.__index]
+
+
+class StablePixels:
+    """Choosing stable pixels for sparse mode of detectors
+
+    Pixel is stable if it is in static_mask or it was background in the last stable_frames frames. Detectors check
+    stable pixels only against their best gaussian and skip the update of the ones which match it; every
+    refresh_period-th frame all pixels are updated. With refresh_period 1 all pixels are updated every frame.
+
+    Attributes:
+        __refresh_period (int): period of frames, when all pixels are updated
+        __stable_frames (int): number of frames in background after which pixel is stable, None for no learning
+        __static (np.ndarray): pixels which are always stable, [height * width]
+        __background_count (np.ndarray): number of the last frames in which pixel was background, [height * width]
+        __frame (int): number of processed frames
+    """
+
+    def __init__(self, number_of_pixels, refresh_period=1, stable_frames=None, static_mask=None):
+        self.__refresh_period = refresh_period
+        self.__stable_frames = stable_frames
+        self.__static = np.zeros(number_of_pixels, dtype=bool) if static_mask is None else \
+            np.asarray(static_mask, dtype=bool).reshape(-1)
+        self.__background_count = np.zeros(number_of_pixels, dtype=int)
+        self.__frame = 0
+
+    def stable_pixels(self):
+        """Stable pixels of the next frame
+
+        Return:
+            pixels (np.ndarray): indexes of stable pixels, None if all pixels are updated
+        """
+        self.__frame += 1
+        if self.__refresh_period <= 1 or self.__frame % self.__refresh_period == 0:
+            return None
+        stable = np.copy(self.__static)
+        if self.__stable_frames is not None:
+            np.logical_or(stable, self.__background_count >= self.__stable_frames, out=stable)
+        # without stable pixels sparse update would only gather and scatter all pixels
+        pixels = np.flatnonzero(stable)
+        return pixels if pixels.shape[0] > 0 else None
+
+    def update(self, foreground):
+        """Counting frames in background
+
+        Arguments:
+            foreground (np.ndarray): true for moving pixels, [height * width]
+        """
+        np.add(self.__background_count, 1, out=self.__background_count)
+        self.__background_count[foreground] = 0
+
+    def get_state(self):
+        """Parameters and arrays for get_state of detectors"""
+        parameters = {"refresh_period": self.__refresh_period, "stable_frames": self.__stable_frames}
+        model = {"static_mask": self.__static, "background_count": self.__background_count,
+                 "frame": np.array(self.__frame)}
+        return parameters, model
+
+    def set_state(self, model):
+        """Restoring arrays made by get_state"""
+        if "background_count" not in model:
+            return
+        np.copyto(self.__static, model["static_mask"])
+        np.copyto(self.__background_count, model["background_count"])
+        self.__frame = int(model["frame"])
+
+
 class FrameDifference:
     """Class for finding moving objects by frame difference method
 
@@ -35,6 +145,10 @@ class FrameDifference:
         __previous_depth (numpy array): previous depth map
         __previous_rgb (numpy array): previous rgb image
         __mask (numpy array): mask, that displays the area of moving object
+        __rgb_frames, __depth_frames (FrameBuffer): buffers of frames for process
+        __rgb_subtraction, __rgb_distance, __depth_subtraction, __moving, __closer (numpy array): preallocated arrays
+            for process
+        __movement_mask (numpy array): mask of changed pixels made by process
     """
 
     def __init__(self, depth_im, rgb_im, rgb_threshold=0.3, depth_threshold=0.05):
@@ -46,6 +160,16 @@ class FrameDifference:
         self.__rgb_threshold = rgb_threshold
         self.__depth_threshold = depth_threshold
 
+        self.__rgb_frames = FrameBuffer(rgb_im)
+        self.__depth_frames = FrameBuffer(depth_im)
+        self.__current_rgb, self.__current_depth = self.__rgb_frames.current, self.__depth_frames.current
+        self.__rgb_subtraction = np.empty_like(rgb_im)
+        self.__rgb_distance = np.empty(rgb_im.shape[:2], dtype=rgb_im.dtype)
+        self.__depth_subtraction = np.empty_like(depth_im)
+        self.__moving = np.empty(depth_im.shape, dtype=bool)
+        self.__closer = np.empty(depth_im.shape, dtype=bool)
+        self.__movement_mask = np.zeros_like(depth_im)
+
     @property
     def current_depth(self):
         return self.__current_depth
@@ -64,28 +188,87 @@ class FrameDifference:
         self.__previous_rgb = np.copy(self.__current_rgb)
         self.__current_rgb = current_rgb
 
-    def subtraction_mask(self):
+    def subtraction_mask(self, dtype=None):
         """Creating a mask for detecting changed pixels
 
         First step is subtraction rgb images for detecting color changes. If difference is more than the threshold
         value, pixel is checking for a depth changing. If it is more, than zero, it is a moving part.
+        The whole frame is processed at once; with dtype=None the arithmetic is done in the dtype of the images, so the
+        mask is the same as the per-pixel one. Passing np.float32 halves the memory traffic.
+
+        Arguments:
+            dtype (np.dtype): type in which distances are calculated, None for type of images
 
         Return:
             mask (np.array): mask of image, where 0 is for standing and 1 is for moving
         """
-        rgb_subtraction = self.__current_rgb - self.__previous_rgb
+        current_rgb, previous_rgb = self.__current_rgb, self.__previous_rgb
+        current_depth, previous_depth = self.__current_depth, self.__previous_depth
+        if dtype is not None:
+            current_rgb, previous_rgb = current_rgb.astype(dtype), previous_rgb.astype(dtype)
+            current_depth, previous_depth = current_depth.astype(dtype), previous_depth.astype(dtype)
+
+        rgb_subtraction = current_rgb - previous_rgb
+        rgb_distance = rgb_subtraction[:, :, 0] * rgb_subtraction[:, :, 0] + \
+            rgb_subtraction[:, :, 1] * rgb_subtraction[:, :, 1] + rgb_subtraction[:, :, 2] * rgb_subtraction[:, :, 2]
 
         mask = np.zeros_like(self.__current_depth)
-        for i in range(rgb_subtraction.shape[0]):
-            for j in range(rgb_subtraction.shape[1]):
-                if rgb_subtraction[i, j, 0] * rgb_subtraction[i, j, 0] + rgb_subtraction[i, j, 1] * rgb_subtraction[
-                    i, j, 1] + rgb_subtraction[i, j, 2] * rgb_subtraction[i, j, 2] > self.__rgb_threshold and \
-                        self.__previous_depth[i, j] - self.__current_depth[i, j] > 0:
-                    mask[i, j] = 1
-                else:
-                    mask[i, j] = 0
+        mask[np.logical_and(rgb_distance > self.__rgb_threshold, previous_depth - current_depth > 0)] = 1
         return mask
 
+    def process(self, rgb_im, depth_im, out=None):
+        """Making mask of changed pixels for the next frame
+
+        The same as setting current_rgb, current_depth and calling subtraction_mask, but frames are copied to
+        preallocated buffers and all calculations are done in preallocated arrays.
+
+        Arguments:
+            rgb_im (np.ndarray): current rgb image
+            depth_im (np.ndarray): current depth image
+            out (np.ndarray): array for mask; if None, the mask of detector is returned and is rewritten by next frame
+
+        Return:
+            mask (np.array): mask of image, where 0 is for standing and 1 is for moving
+        """
+        self.__previous_rgb, self.__current_rgb = self.__rgb_frames.push(rgb_im, self.__current_rgb)
+        self.__previous_depth, self.__current_depth = self.__depth_frames.push(depth_im, self.__current_depth)
+
+        np.subtract(self.__current_rgb, self.__previous_rgb, out=self.__rgb_subtraction)
+        np.multiply(self.__rgb_subtraction, self.__rgb_subtraction, out=self.__rgb_subtraction)
+        np.add(self.__rgb_subtraction[:, :, 0], self.__rgb_subtraction[:, :, 1], out=self.__rgb_distance)
+        np.add(self.__rgb_distance, self.__rgb_subtraction[:, :, 2], out=self.__rgb_distance)
+        np.greater(self.__rgb_distance, self.__rgb_threshold, out=self.__moving)
+
+        np.subtract(self.__previous_depth, self.__current_depth, out=self.__depth_subtraction)
+        np.greater(self.__depth_subtraction, 0, out=self.__closer)
+        np.logical_and(self.__moving, self.__closer, out=self.__moving)
+
+        if out is None:
+            out = self.__movement_mask
+        np.copyto(out, self.__moving)
+        return out
+
+    def get_state(self):
+        """Parameters and model of detector for save_detector
+
+        Return:
+            parameters (dict): arguments of constructor except images
+            model (dict): arrays of model by names
+        """
+        parameters = {"rgb_threshold": self.__rgb_threshold, "depth_threshold": self.__depth_threshold}
+        model = {"rgb": self.__current_rgb, "depth": self.__current_depth}
+        return parameters, model
+
+    def set_state(self, model):
+        """Restoring model made by get_state
+
+        Arguments:
+            model (dict): arrays of model by names
+        """
+        self.__current_rgb, self.__current_depth = self.__rgb_frames.current, self.__depth_frames.current
+        np.copyto(self.__current_rgb, model["rgb"])
+        np.copyto(self.__current_depth, model["depth"])
+
     def create_mask(self, movement_mask):
         self.__mask = region_growing(movement_mask, self.__current_depth, self.__depth_threshold)
         return self.__mask
@@ -104,13 +287,20 @@ class ViBЕ:
         __threshold_r (float): threshold value of color vector in color space
         __threshold_lambda (int): threshold value for number of neighbours
         __time_factor (int): value representing probability
+        __batch_mode (bool): whole frame is classified and updated at once instead of pixel by pixel; masks differ
+            from the per-pixel ones, which are the default
+        __rng (numpy.random.Generator): generator of random decisions for batch mode
+        __rgb_frames (FrameBuffer): buffer of frames for process
+        __scratch (dict): preallocated arrays for batch mode
+        __dtype (np.dtype): type in which distances to samples are calculated in batch mode; samples are kept in the
+            type of images, so uint8 images with np.float32 take 8 times less memory than float64 ones (threshold_r
+            is then in squared uint8 units)
     """
 
     def __init__(self, rgb_im, number_of_samples=20, threshold_lambda=2, threshold_r=20 / 255, time_factor=16,
-                 neighbourhood_area=4):
+                 neighbourhood_area=4, batch_mode=False, seed=None, dtype=np.float64):
         self.__current_rgb = rgb_im
         self.__previous_rgb = np.empty_like(rgb_im)
-        self.__background = np.empty([rgb_im.shape[0], rgb_im.shape[1], number_of_samples, 3])
         self.__mask = np.empty([rgb_im.shape[0], rgb_im.shape[1]])
         self.__potential_neighbours = np.arange(-neighbourhood_area, neighbourhood_area + 1)
         self.__potential_neighbours = self.__potential_neighbours[self.__potential_neighbours != 0]
@@ -118,6 +308,12 @@ class ViBЕ:
         self.__threshold_r = threshold_r
         self.__threshold_lambda = threshold_lambda
         self.__time_factor = time_factor
+        self.__batch_mode = batch_mode
+        self.__rng = np.random.default_rng(seed)
+        self.__dtype = dtype
+        self.__rgb_frames = FrameBuffer(rgb_im)
+        self.__current_rgb = self.__rgb_frames.current
+        self.__scratch = create_sample_scratch(rgb_im.shape[0], rgb_im.shape[1], dtype)
         self.initial_background()
         # self.set_mask()
 
@@ -127,23 +323,107 @@ class ViBЕ:
         For every "pixel" in background, which contains __number_of_samples samples, a value of neighbour is choosing;
         the first value in samples is its own.
         """
-        resolution_i = self.__current_rgb.shape[0]
-        resolution_j = self.__current_rgb.shape[1]
         self.__previous_rgb = np.copy(self.__current_rgb)
-        for i in range(self.__current_rgb.shape[0]):
-            for j in range(self.__previous_rgb.shape[1]):
-                self.__background[i, j, 0] = self.__current_rgb[i, j]
-                for k in range(1, self.__number_of_samples):
-                    rand_i = get_random_neighbour(i, resolution_i, self.__potential_neighbours)
-                    rand_j = get_random_neighbour(j, resolution_j, self.__potential_neighbours)
-                    self.__background[i, j, k] = self.__current_rgb[rand_i, rand_j]
-
-    def set_mask(self):
-        """Going through all pixels in mask"""
+        self.__background = initial_background_samples(self.__current_rgb, self.__number_of_samples,
+                                                       self.__potential_neighbours, self.__rng)
+
+    def set_mask(self, roi=None):
+        """Going through all pixels in mask
+
+        Arguments:
+            roi (np.ndarray): region of interest, only its pixels are classified and updated, the others are background;
+                None for the whole image
+        """
+        if self.__batch_mode:
+            self.set_mask_batch(roi)
+            return
+        if roi is not None:
+            self.__mask.fill(0)
+            for i, j in zip(*np.nonzero(roi)):
+                self.set_pixel(i, j)
+            return
         for i in range(self.__current_rgb.shape[0]):
             for j in range(self.__current_rgb.shape[1]):
                 self.set_pixel(i, j)
 
+    def set_mask_batch(self, roi=None):
+        """Choosing status of all pixels at once
+
+        The same rules as in set_pixel, but distances to all samples are calculated for the whole frame and all random
+        decisions are taken from one random block generated for the frame. Unlike the per-pixel pass, the frame is
+        classified before any sample is updated.
+
+        Arguments:
+            roi (np.ndarray): region of interest, only its pixels are classified and updated; None for the whole image
+        """
+        scratch = self.__scratch
+        random_block = self.__rng.random(out=scratch["random_block"])
+        if roi is None:
+            background = in_background_samples(self.__background, self.__current_rgb, self.__threshold_r,
+                                               self.__threshold_lambda, scratch)
+            np.copyto(self.__mask, np.logical_not(background, out=scratch["foreground"]))
+        else:
+            background = roi_background_samples(self.__background, self.__current_rgb, roi, self.__threshold_r,
+                                                self.__threshold_lambda, scratch)
+            np.copyto(self.__mask, scratch["foreground"])
+
+        chance = 1 / self.__time_factor
+        update_pixel = np.logical_and(background, np.less(random_block[0], chance, out=scratch["update_pixel"]),
+                                      out=scratch["update_pixel"])
+        update_neighbour = np.logical_and(background,
+                                          np.less(random_block[1], chance, out=scratch["update_neighbour"]),
+                                          out=scratch["update_neighbour"])
+        update_background_samples(self.__background, self.__current_rgb, update_pixel, update_neighbour,
+                                  random_block, self.__potential_neighbours)
+
+    def process(self, rgb_im, depth_im=None, out=None, roi=None):
+        """Making mask of the next frame
+
+        The same as setting current_rgb and calling set_mask, but the frame is copied to a preallocated buffer.
+
+        Arguments:
+            rgb_im (np.ndarray): current rgb image
+            depth_im (np.ndarray): not used, is here for the same interface with other detectors
+            out (np.ndarray): array for mask; if None, the mask of detector is returned and is rewritten by next frame
+            roi (np.ndarray): region of interest, see set_mask
+
+        Return:
+            mask (np.ndarray): mask, where 1 is for moving pixels
+        """
+        self.__previous_rgb, self.__current_rgb = self.__rgb_frames.push(rgb_im, self.__current_rgb)
+        self.set_mask(roi)
+        if out is None:
+            return self.__mask
+        np.copyto(out, self.__mask)
+        return out
+
+    def get_state(self):
+        """Parameters and model of detector for save_detector
+
+        Return:
+            parameters (dict): arguments of constructor except images
+            model (dict): arrays of model by names
+        """
+        parameters = {"number_of_samples": self.__number_of_samples, "threshold_lambda": self.__threshold_lambda,
+                      "threshold_r": self.__threshold_r, "time_factor": self.__time_factor,
+                      "neighbourhood_area": int(np.max(self.__potential_neighbours)), "batch_mode": self.__batch_mode,
+                      "dtype": np.dtype(self.__dtype).name}
+        model = {"rgb": self.__current_rgb, "background": self.__background, "mask": self.__mask,
+                 "rng_state": get_rng_state(self.__rng)}
+        return parameters, model
+
+    def set_state(self, model):
+        """Restoring model made by get_state
+
+        Arguments:
+            model (dict): arrays of model by names
+        """
+        self.__current_rgb = self.__rgb_frames.current
+        np.copyto(self.__current_rgb, model["rgb"])
+        np.copyto(self.__background, model["background"])
+        np.copyto(self.__mask, model["mask"])
+        set_rng_state(self.__rng, model["rng_state"])
+
     def set_pixel(self, i, j):
         """Choosing status of pixel: background or foreground
 
@@ -238,10 +518,18 @@ class DEVB:
         __depth_background (numpy.array): a model of background in depth format
         __mask (numpy.array): mask, that displays the area of moving object
         __potential_neighbours (numpy.array): array which represents area of neighbour value searching
+        __batch_mode (bool): whole frame is classified and updated at once instead of pixel by pixel; masks differ
+            from the per-pixel ones, which are the default
+        __rng (numpy.random.Generator): generator of random decisions for batch mode
+        __rgb_frames (FrameBuffer): buffer of frames for process
+        __scratch (dict): preallocated arrays for batch mode
+        __dtype (np.dtype): type in which distances to samples and depth background are calculated in batch mode;
+            samples and depth background are kept in the types of images
     """
 
     def __init__(self, rgb_im, depth_im, number_of_samples=20, threshold_lambda=2, threshold_r=20 / 255,
-                 threshold_theta=3 / 255, time_factor=16, neighbourhood_area=4):
+                 threshold_theta=3 / 255, time_factor=16, neighbourhood_area=4, batch_mode=False, seed=None,
+                 dtype=np.float64):
 
         self.__current_rgb = rgb_im
         self.__current_depth = depth_im
@@ -252,9 +540,14 @@ class DEVB:
         self.__threshold_r = threshold_r
         self.__threshold_lambda = threshold_lambda
         self.__time_factor = time_factor
-
-        self.__background = np.empty([rgb_im.shape[0], rgb_im.shape[1], number_of_samples, 3])
-        self.__depth_background = depth_im
+        self.__batch_mode = batch_mode
+        self.__rng = np.random.default_rng(seed)
+        self.__dtype = dtype
+        self.__rgb_frames = FrameBuffer(rgb_im)
+        self.__current_rgb = self.__rgb_frames.current
+        self.__scratch = create_sample_scratch(rgb_im.shape[0], rgb_im.shape[1], dtype)
+
+        self.__depth_background = np.copy(depth_im)
         self.__mask = np.empty([rgb_im.shape[0], rgb_im.shape[1]])
         self.__potential_neighbours = np.arange(-neighbourhood_area, neighbourhood_area + 1)
         self.__potential_neighbours = self.__potential_neighbours[self.__potential_neighbours != 0]
@@ -267,23 +560,120 @@ class DEVB:
         For every "pixel" in background, which contains __number_of_samples samples, a value of neighbour is choosing;
         the first value in samples is its own.
         """
-        resolution_i = self.__current_rgb.shape[0]
-        resolution_j = self.__current_rgb.shape[1]
         self.__previous_rgb = np.copy(self.__current_rgb)
-        for i in range(self.__current_rgb.shape[0]):
-            for j in range(self.__previous_rgb.shape[1]):
-                self.__background[i, j, 0] = self.__current_rgb[i, j]
-                for k in range(1, self.__number_of_samples):
-                    rand_i = get_random_neighbour(i, resolution_i, self.__potential_neighbours)
-                    rand_j = get_random_neighbour(j, resolution_j, self.__potential_neighbours)
-                    self.__background[i, j, k] = self.__current_rgb[rand_i, rand_j]
-
-    def set_mask(self):
-        """Going through all pixels in mask"""
+        self.__background = initial_background_samples(self.__current_rgb, self.__number_of_samples,
+                                                       self.__potential_neighbours, self.__rng)
+
+    def set_mask(self, roi=None):
+        """Going through all pixels in mask
+
+        Arguments:
+            roi (np.ndarray): region of interest, only its pixels are classified and updated, the others are background;
+                None for the whole image
+        """
+        if self.__batch_mode:
+            self.set_mask_batch(roi)
+            return
+        if roi is not None:
+            self.__mask.fill(0)
+            for i, j in zip(*np.nonzero(roi)):
+                self.set_pixel(i, j)
+            return
         for i in range(self.__current_rgb.shape[0]):
             for j in range(self.__current_rgb.shape[1]):
                 self.set_pixel(i, j)
 
+    def set_mask_batch(self, roi=None):
+        """Choosing status of all pixels at once
+
+        The same rules as in set_pixel, evaluated as masked array operations over the whole frame. All random decisions
+        are taken from one random block generated for the frame, and the frame is classified before any sample or
+        depth_background is updated.
+
+        Arguments:
+            roi (np.ndarray): region of interest, only its pixels are classified and updated; None for the whole image
+        """
+        scratch = self.__scratch
+        random_block = self.__rng.random(out=scratch["random_block"])
+        not_background = scratch["close"]
+        if roi is None:
+            background = in_background_samples(self.__background, self.__current_rgb, self.__threshold_r,
+                                               self.__threshold_lambda, scratch)
+            np.logical_not(background, out=not_background)
+        else:
+            background = roi_background_samples(self.__background, self.__current_rgb, roi, self.__threshold_r,
+                                                self.__threshold_lambda, scratch)
+            np.copyto(not_background, scratch["foreground"])
+        np.subtract(self.__depth_background, self.__current_depth, out=scratch["distance"], dtype=self.__dtype)
+        closer = np.greater(scratch["distance"], self.__threshold_theta, out=scratch["foreground"])
+        np.logical_and(closer, not_background, out=closer)
+        np.copyto(self.__mask, closer)
+
+        chance = 1 / self.__time_factor
+        update = np.logical_or(background, closer, out=scratch["close"])
+        update_pixel = np.logical_and(update, np.less(random_block[0], chance, out=scratch["update_pixel"]),
+                                      out=scratch["update_pixel"])
+        update_neighbour = np.logical_and(update, np.less(random_block[1], chance, out=scratch["update_neighbour"]),
+                                          out=scratch["update_neighbour"])
+        update_background_samples(self.__background, self.__current_rgb, update_pixel, update_neighbour,
+                                  random_block, self.__potential_neighbours)
+
+        update_depth = np.logical_or(closer, update_neighbour, out=scratch["close"])
+        np.copyto(self.__depth_background, self.__current_depth, where=update_depth)
+
+    def process(self, rgb_im, depth_im, out=None, roi=None):
+        """Making mask of the next frame
+
+        The same as set_images and set_mask, but the rgb frame is copied to a preallocated buffer. Depth frame is used
+        only during the call, so it may be rewritten by the caller afterwards.
+
+        Arguments:
+            rgb_im (np.ndarray): current rgb image
+            depth_im (np.ndarray): current depth image
+            out (np.ndarray): array for mask; if None, the mask of detector is returned and is rewritten by next frame
+            roi (np.ndarray): region of interest, see set_mask
+
+        Return:
+            mask (np.ndarray): mask, where 1 is for moving pixels
+        """
+        self.__previous_rgb, self.__current_rgb = self.__rgb_frames.push(rgb_im, self.__current_rgb)
+        self.__current_depth = depth_im
+        self.set_mask(roi)
+        if out is None:
+            return self.__mask
+        np.copyto(out, self.__mask)
+        return out
+
+    def get_state(self):
+        """Parameters and model of detector for save_detector
+
+        Return:
+            parameters (dict): arguments of constructor except images
+            model (dict): arrays of model by names
+        """
+        parameters = {"number_of_samples": self.__number_of_samples, "threshold_lambda": self.__threshold_lambda,
+                      "threshold_r": self.__threshold_r, "threshold_theta": self.__threshold_theta,
+                      "time_factor": self.__time_factor, "neighbourhood_area": int(np.max(self.__potential_neighbours)),
+                      "batch_mode": self.__batch_mode, "dtype": np.dtype(self.__dtype).name}
+        model = {"rgb": self.__current_rgb, "depth": self.__current_depth, "background": self.__background,
+                 "depth_background": self.__depth_background, "mask": self.__mask,
+                 "rng_state": get_rng_state(self.__rng)}
+        return parameters, model
+
+    def set_state(self, model):
+        """Restoring model made by get_state
+
+        Arguments:
+            model (dict): arrays of model by names
+        """
+        self.__current_rgb = self.__rgb_frames.current
+        np.copyto(self.__current_rgb, model["rgb"])
+        self.__current_depth = np.copy(model["depth"])
+        np.copyto(self.__background, model["background"])
+        np.copyto(self.__depth_background, model["depth_background"])
+        np.copyto(self.__mask, model["mask"])
+        set_rng_state(self.__rng, model["rng_state"])
+
     def set_pixel(self, i, j):
         """Choosing status of pixel: background or foreground
 
@@ -377,20 +767,30 @@ class DEVB:
 class RGB_MoG:
     """Class for finding moving objects by Mixture of Gaussians with RGB image
 
+    Parameters of gaussians are stored as arrays for all pixels of image, so every step is done for the whole frame.
+    Parameters are updated in place, intermediate values and ranking are kept in preallocated arrays; only buffers of
+    ufuncs for casting of images, which don't depend on the size of image, are allocated for every frame.
+
     Attributes:
         __number_of_gaussians (int): number of gaussians for each color channel in each pixel
         __learning_rate_alfa (float): coefficient representing speed of changing of gaussians
         __height (int): height of image
         __width (int): width of image
         __number_of_channels (int): number of color channels of image
-        __current_rgb (np.ndarray): current rgb image
-        __gaussians (list): list with Gaussian() objects, describing gaussians of pixel
+        __current_rgb (np.ndarray): current rgb image, [height * width, number_of_channels]
+        __mean (np.ndarray): means of gaussians, [height * width, number_of_gaussians, number_of_channels]
+        __variance (np.ndarray): variances of gaussians, [height * width, number_of_gaussians]
+        __weight (np.ndarray): weights of gaussians, [height * width, number_of_gaussians]
+        __ranking (np.ndarray): indexes of gaussians sorted by rank, [height * width, number_of_gaussians]
         __mask (np.ndarray): mask, that displays the area of moving object
+        __scratch (dict): preallocated arrays for intermediate values
+        __dtype (np.dtype): type of parameters of gaussians; np.float32 halves the memory of model
     """
 
-    def __init__(self, rgb_im, number_of_gaussians=2, learning_rate_alfa=0.025):
+    def __init__(self, rgb_im, number_of_gaussians=2, learning_rate_alfa=0.025, dtype=np.float64):
         self.__number_of_gaussians = number_of_gaussians
         self.__learning_rate_alfa = learning_rate_alfa
+        self.__dtype = dtype
 
         self.__height = rgb_im.shape[0]
         self.__width = rgb_im.shape[1]
@@ -400,10 +800,23 @@ class RGB_MoG:
         except:
             self.__number_of_channels = 1
 
-        self.__current_rgb = rgb_im
-        self.__gaussians = []
+        number_of_pixels = self.__height * self.__width
+        self.__current_rgb = rgb_im.reshape(number_of_pixels, self.__number_of_channels)
+        self.__mean = np.empty([number_of_pixels, number_of_gaussians, self.__number_of_channels], dtype=dtype)
+        self.__variance = np.empty([number_of_pixels, number_of_gaussians], dtype=dtype)
+        self.__weight = np.empty([number_of_pixels, number_of_gaussians], dtype=dtype)
+        self.__ranking = np.empty([number_of_pixels, number_of_gaussians], dtype=int)
         self.__mask = np.zeros([self.__height, self.__width])
 
+        self.__scratch = {"difference": np.empty_like(self.__mean), "matching": np.empty_like(self.__variance, bool),
+                          "not_matching": np.empty_like(self.__variance, bool),
+                          "matching_pixels": np.empty(number_of_pixels, dtype=bool),
+                          "pixel_distance": np.empty(number_of_pixels, dtype=dtype),
+                          "positions": np.empty_like(self.__ranking),
+                          "rank_condition": np.empty(number_of_pixels, dtype=bool)}
+        for name in ["dist_square", "probability", "learning_rate_ro", "temp"]:
+            self.__scratch[name] = np.empty_like(self.__variance)
+
         self.initialization()
 
     def initialization(self):
@@ -412,89 +825,91 @@ class RGB_MoG:
         For each channel of the pixel mean is a color of image; variances are ones; weights are 1/number_of_gaussians;
         ranking is a sequence.
         """
-        variance = np.ones([self.__number_of_gaussians])
-        weight = np.ones([self.__number_of_gaussians]) / self.__number_of_gaussians
-        initial_ranking = np.arange(self.__number_of_gaussians)
-
-        for h in range(self.__height):
-            for w in range(self.__width):
-                mean = np.zeros([self.__number_of_gaussians, self.__number_of_channels]) + self.__current_rgb[h, w]
-                self.__gaussians.append(
-                    Gaussian(index=np.asarray([h, w]), color_mean=mean, color_variance=variance, weight=weight,
-                             ranking=initial_ranking))
+        self.__mean[...] = self.__current_rgb[:, np.newaxis, :]
+        self.__variance.fill(1)
+        self.__weight.fill(1 / self.__number_of_gaussians)
+        self.__ranking[...] = np.arange(self.__number_of_gaussians)
 
-    def set_raking(self, gauss):
+    def set_raking(self):
         """Sets rank
 
-        Calculating rating for each gaussian
-
-        Arguments:
-            gauss (Gaussian): gaussians of current pixel
+        Calculating rating for each gaussian of each pixel
         """
-        gauss.ranking = np.argsort(-gauss.weight / gauss.color_variance)
+        temp = np.divide(np.negative(self.__weight, out=self.__scratch["temp"]), self.__variance,
+                         out=self.__scratch["temp"])
+        rank_in_place(temp, self.__ranking, self.__scratch)
 
-    def probability(self, gauss):
+    def probability(self):
         """Gaussian probability density
 
         Calculating probability of each gaussian and their matching (possibility of matching current color to gaussian.
 
-        Arguments:
-            gauss (Gaussian): gaussians of current pixel
+        Return:
+            matching_criterion (np.ndarray): array of matching colors to gaussians,
+                [height * width, number_of_gaussians]
+            probability (np.ndarray): array of probability densities for every gaussian
         """
-        dist_square = np.sum((self.__current_rgb[gauss.index[0], gauss.index[1]] - gauss.color_mean) ** 2,
-                             axis=1) / gauss.color_variance
-        dist = np.sqrt(dist_square)
-
-        probability = np.exp(dist_square / (-2)) / (np.sqrt((2 * np.pi) ** 3) * gauss.color_variance)
-
-        matching_criterion = (dist < 2.5 * gauss.color_variance)
+        scratch = self.__scratch
+        difference = np.subtract(self.__current_rgb[:, np.newaxis, :], self.__mean, out=scratch["difference"])
+        np.multiply(difference, difference, out=difference)
+        dist_square = np.divide(np.sum(difference, axis=2, out=scratch["dist_square"]), self.__variance,
+                                out=scratch["dist_square"])
+
+        probability = np.exp(np.divide(dist_square, -2, out=scratch["probability"]), out=scratch["probability"])
+        temp = np.multiply(self.__variance, np.sqrt((2 * np.pi) ** 3), out=scratch["temp"])
+        np.divide(probability, temp, out=probability)
+
+        dist = np.sqrt(dist_square, out=scratch["learning_rate_ro"])
+        matching_criterion = np.less(dist, np.multiply(self.__variance, 2.5, out=temp), out=scratch["matching"])
         return matching_criterion, probability
 
-    def update(self, gauss, matching_criterion, probability):
+    def update(self, matching_criterion, probability):
         """Updating gaussian parameters
 
         Updating of mean, variance and weight of gaussian if color matches to them; else mean is current color, variance
-        is a list of 4 and weight is becoming less.
+        is 4 and weight is becoming less. Squared differences between color and means must be in scratch["difference"]
+        after probability.
 
         Arguments:
-            gauss (Gaussian): gaussians of current pixel
             matching_criterion (np.ndarray): array of matching colors to gaussians
             probability (np.ndarray): array of probability densities for every gaussian
         """
+        scratch = self.__scratch
+        alpha = self.__learning_rate_alfa
+        not_matching = np.logical_not(matching_criterion, out=scratch["not_matching"])
 
-        learning_rate_ro = self.__learning_rate_alfa * probability
-
-        update_status = np.bitwise_or.reduce(matching_criterion, axis=0)
-        update_mask = np.where(update_status, matching_criterion, -1)
+        learning_rate_ro = np.multiply(probability, alpha, out=scratch["learning_rate_ro"])
+        difference = scratch["difference"]
+        pixel_distance = np.sum(difference.reshape(difference.shape[0], -1), axis=1, out=scratch["pixel_distance"])
 
-        gauss.weight = np.where(update_mask == 1,
-                                (1 - self.__learning_rate_alfa) * gauss.weight + self.__learning_rate_alfa,
-                                (1 - self.__learning_rate_alfa) * gauss.weight)
+        np.multiply(self.__weight, 1 - alpha, out=self.__weight)
+        np.add(self.__weight, alpha, out=self.__weight, where=matching_criterion)
 
-        gauss.color_variance = np.where(update_mask == 1, np.sqrt(
-            (1 - learning_rate_ro) * (gauss.color_variance ** 2) + learning_rate_ro * (
-                np.sum(np.subtract(self.__current_rgb[gauss.index[0], gauss.index[1]], gauss.color_mean) ** 2))),
-                                        3 + np.ones(self.__number_of_gaussians))
+        variance = np.multiply(self.__variance, self.__variance, out=scratch["dist_square"])
+        one_minus_ro = np.subtract(1, learning_rate_ro, out=scratch["probability"])
+        np.multiply(one_minus_ro, variance, out=variance)
+        np.add(variance, np.multiply(learning_rate_ro, pixel_distance[:, np.newaxis], out=scratch["temp"]),
+               out=variance)
+        np.sqrt(variance, out=self.__variance, where=matching_criterion)
+        np.copyto(self.__variance, 3 + 1, where=not_matching)
 
-        for i in range(self.__number_of_gaussians):
-            if update_mask[i] == 1:
-                gauss.color_mean[i] = (1 - learning_rate_ro[i]) * gauss.color_mean[i] + learning_rate_ro[i] * \
-                                      self.__current_rgb[gauss.index[0], gauss.index[1]]
-            else:
-                gauss.color_mean[i] = self.__current_rgb[gauss.index[0], gauss.index[1]]
+        np.multiply(self.__mean, one_minus_ro[:, :, np.newaxis], out=self.__mean)
+        np.add(self.__mean, np.multiply(learning_rate_ro[:, :, np.newaxis], self.__current_rgb[:, np.newaxis, :],
+                                        out=difference), out=self.__mean)
+        np.copyto(self.__mean, np.broadcast_to(self.__current_rgb[:, np.newaxis, :], self.__mean.shape),
+                  where=not_matching[:, :, np.newaxis])
 
     def make_mask(self, matching_criterion):
-        """Setting a pixel for mask
+        """Setting pixels for mask
 
         Set pixel white if pixel is for foreground
 
         Arguments:
-            matching_criterion (np.ndarray): mask for moving objects
+            matching_criterion (np.ndarray): array of matching colors to gaussians
         """
-        matching = np.bitwise_or.reduce(matching_criterion, axis=0)
-        res = np.where(matching, 0, 255)
-
-        return res
+        matching = np.any(matching_criterion, axis=1, out=self.__scratch["matching_pixels"])
+        np.copyto(self.__mask, np.logical_not(matching, out=matching).reshape(self.__height, self.__width))
+        np.multiply(self.__mask, 255, out=self.__mask)
 
     def set_mask(self, rgb_im):
         """Making mask of moving object
@@ -504,19 +919,61 @@ class RGB_MoG:
         Arguments:
             rgb_im (np.ndarray): array of image
         """
-        self.__current_rgb = rgb_im
-        for gauss in self.__gaussians:
-            self.set_raking(gauss)
-            matching_criterion, probability = self.probability(gauss)
-            self.update(gauss, matching_criterion, probability)
-            self.__mask[gauss.index[0], gauss.index[1]] = self.make_mask(matching_criterion)
+        self.__current_rgb = rgb_im.reshape(self.__height * self.__width, self.__number_of_channels)
+        self.set_raking()
+        matching_criterion, probability = self.probability()
+        self.update(matching_criterion, probability)
+        self.make_mask(matching_criterion)
         return self.__mask
 
+    def process(self, rgb_im, depth_im=None, out=None):
+        """Making mask of the next frame
+
+        Arguments:
+            rgb_im (np.ndarray): current rgb image
+            depth_im (np.ndarray): not used, is here for the same interface with other detectors
+            out (np.ndarray): array for mask; if None, the mask of detector is returned and is rewritten by next frame
+
+        Return:
+            mask (np.ndarray): mask, where 255 is for moving pixels
+        """
+        self.set_mask(rgb_im)
+        if out is None:
+            return self.__mask
+        np.copyto(out, self.__mask)
+        return out
+
+    def get_state(self):
+        """Parameters and model of detector for save_detector
+
+        Return:
+            parameters (dict): arguments of constructor except images
+            model (dict): arrays of model by names
+        """
+        parameters = {"number_of_gaussians": self.__number_of_gaussians,
+                      "learning_rate_alfa": self.__learning_rate_alfa, "dtype": np.dtype(self.__dtype).name}
+        model = {"rgb": self.__current_rgb.reshape(self.__height, self.__width, self.__number_of_channels),
+                 "mean": self.__mean, "variance": self.__variance, "weight": self.__weight,
+                 "ranking": self.__ranking, "mask": self.__mask}
+        return parameters, model
+
+    def set_state(self, model):
+        """Restoring model made by get_state
+
+        Arguments:
+            model (dict): arrays of model by names
+        """
+        self.__current_rgb = np.copy(model["rgb"]).reshape(self.__height * self.__width, self.__number_of_channels)
+        for name, parameter in [("mean", self.__mean), ("variance", self.__variance), ("weight", self.__weight),
+                                ("ranking", self.__ranking), ("mask", self.__mask)]:
+            np.copyto(parameter, model[name])
+
 
 class RGBD_MoG:
 
     def __init__(self, rgb_im, depth_im, number_of_gaussians=3, learning_rate_alfa=.025, depth_reliability_ro=0.2,
-                 matching_rate_beta=2.5, luminance_min=16, depth_threshold=0.01, reliability_threshold=.4):
+                 matching_rate_beta=2.5, luminance_min=16, depth_threshold=0.01, reliability_threshold=.4,
+                 refresh_period=1, stable_frames=None, static_mask=None):
 
         self.__number_of_gaussians = number_of_gaussians
         self.__learning_rate_alfa = learning_rate_alfa
@@ -537,6 +994,9 @@ class RGBD_MoG:
         self.__current_depth = depth_im
         self.__gaussians = []
         self.__mask = np.zeros_like(depth_im)
+        self.__stable_pixels = StablePixels(self.__height * self.__width, refresh_period, stable_frames, static_mask)
+        # the first frame is the first observation of gaussians
+        self.__frames_seen = 1
 
         self.initialization()
 
@@ -672,25 +1132,130 @@ class RGBD_MoG:
         else:
             self.__mask[gauss.index[0], gauss.index[1]] = 255
 
-    def set_mask(self, rgb_im, depth_im):
+    def set_mask(self, rgb_im, depth_im, roi=None):
         self.__current_yuv = RGB_to_YUV(rgb_im)
         self.__current_depth = depth_im
-        number_of_observations = self.__gaussians[0].depth_observations[0, 1] + 1
-
-        for gauss in self.__gaussians:
+        # frames are counted by detector, as pixels out of region of interest or stable ones aren't updated
+        self.__frames_seen += 1
+        number_of_observations = self.__frames_seen
+
+        stable = np.zeros(len(self.__gaussians), dtype=bool)
+        stable_pixels = self.__stable_pixels.stable_pixels()
+        if stable_pixels is not None:
+            stable[stable_pixels] = True
+
+        # pixels out of region of interest are background and aren't updated
+        skipped = np.zeros(len(self.__gaussians), dtype=bool) if roi is None else \
+            np.logical_not(np.asarray(roi, dtype=bool).reshape(-1))
+
+        for gauss, stable_pixel, skipped_pixel in zip(self.__gaussians, stable, skipped):
+            if skipped_pixel:
+                self.__mask[gauss.index[0], gauss.index[1]] = 0
+                continue
+            # stable pixel, which matches its best gaussian, is background and isn't updated
+            if stable_pixel and self.matching(gauss)[gauss.ranking[0]]:
+                self.__mask[gauss.index[0], gauss.index[1]] = 0
+                continue
             self.set_ranking(gauss)
             matching_criterion = self.matching(gauss)
             self.update(gauss, matching_criterion, number_of_observations)
             self.pixel_mask(gauss, matching_criterion)
 
+        self.__stable_pixels.update(self.__mask.reshape(-1) > 0)
         return self.__mask
 
+    def process(self, rgb_im, depth_im, out=None, roi=None):
+        """Making mask of the next frame
+
+        Arguments:
+            rgb_im (np.ndarray): current rgb image
+            depth_im (np.ndarray): current depth image, 255 is for pixels without depth
+            out (np.ndarray): array for mask; if None, the mask of detector is returned and is rewritten by next frame
+            roi (np.ndarray): region of interest, only its pixels are classified and updated, the others are background;
+                None for the whole image
+
+        Return:
+            mask (np.ndarray): mask, where 255 is for moving pixels
+        """
+        self.set_mask(rgb_im, depth_im, roi)
+        if out is None:
+            return self.__mask
+        np.copyto(out, self.__mask)
+        return out
+
+    def get_state(self):
+        """Parameters and model of detector for save_detector
+
+        Parameters of gaussians are stacked in arrays [height * width, number_of_gaussians, ...] with the names of
+        attributes of Fast_RGBD_MoG.
+
+        Return:
+            parameters (dict): arguments of constructor except images
+            model (dict): arrays of model by names
+        """
+        parameters = {"number_of_gaussians": self.__number_of_gaussians,
+                      "learning_rate_alfa": self.__learning_rate_alfa,
+                      "depth_reliability_ro": self.__depth_reliability_ro,
+                      "matching_rate_beta": self.__matching_rate_beta, "luminance_min": self.__luminance_min,
+                      "depth_threshold": self.__depth_threshold, "reliability_threshold": self.__reliability_threshold}
+        model = {"depth": self.__current_depth, "mask": self.__mask, "frames_seen": np.array(self.__frames_seen)}
+        for name in GAUSSIAN_PARAMETERS:
+            model[name] = np.stack([getattr(gauss, name) for gauss in self.__gaussians])
+        stable_parameters, stable_model = self.__stable_pixels.get_state()
+        parameters.update(stable_parameters)
+        model.update(stable_model)
+        return parameters, model
+
+    def set_state(self, model):
+        """Restoring model made by get_state
+
+        Arguments:
+            model (dict): arrays of model by names
+        """
+        self.__current_depth = np.copy(model["depth"])
+        np.copyto(self.__mask, model["mask"])
+        for n, gauss in enumerate(self.__gaussians):
+            for name in GAUSSIAN_PARAMETERS:
+                setattr(gauss, name, np.copy(model[name][n]))
+        self.__frames_seen = frames_seen(model)
+        self.__stable_pixels.set_state(model)
+
 
 class Fast_RGBD_MoG:
+    """Class for finding moving objects by Mixture of Gaussians with RGB and depth images
+
+    Array implementation of RGBD_MoG: parameters of gaussians are stored for all pixels of image, so every step is done
+    for the whole frame. Masks are the same as the ones of RGBD_MoG.set_mask. Parameters are updated in place,
+    intermediate values and ranking are kept in preallocated arrays. Index arrays of pixels, which gaussians are
+    replaced because nothing matches, are allocated for every frame, so the allocation grows with the number of such
+    pixels, not with the size of image.
+    With dtype other than np.float64 parameters are kept in dtype and uint8 rgb images are converted to YUV in fixed
+    point (RGB_to_YUV_fixed_point), so masks are slightly different from the ones of RGBD_MoG.
+    In sparse mode (refresh_period > 1 with stable_frames or static_mask, see StablePixels) stable pixels, which match
+    their best gaussian, are background without updating (as they would be after the update), and only the other pixels
+    are gathered, updated as a smaller image and scattered back; gathered parameters are new arrays of every frame.
+
+    Attributes:
+        __luminance_mean (np.ndarray): means of luminance, [height * width, number_of_gaussians]
+        __color_mean (np.ndarray): means of color (U, V), [height * width, number_of_gaussians, 2]
+        __depth_mean (np.ndarray): means of depth, [height * width, number_of_gaussians]
+        __luminance_variance (np.ndarray): variances of luminance, [height * width, number_of_gaussians]
+        __color_variance (np.ndarray): variances of color, [height * width, number_of_gaussians]
+        __depth_variance (np.ndarray): variances of depth, [height * width, number_of_gaussians]
+        __weight (np.ndarray): weights of gaussians, [height * width, number_of_gaussians]
+        __ranking (np.ndarray): indexes of gaussians sorted by rank, [height * width, number_of_gaussians]
+        __depth_observations (np.ndarray): reliability of depth and number of observations of gaussians,
+            [height * width, number_of_gaussians, 2]
+        __mask (np.ndarray): mask, that displays the area of moving object
+        __scratch (dict): preallocated arrays for intermediate values
+        __dtype (np.dtype): type of parameters of gaussians
+        __stable_pixels (StablePixels): choice of pixels for sparse mode
+        __frames_seen (int): number of frames including the first one, it is the number of the current observation
+    """
 
     def __init__(self, rgb_im, depth_im, number_of_gaussians=3, learning_rate_alfa=.025, depth_reliability_ro=0.2,
                  matching_rate_beta=2.5, luminance_min=16, depth_threshold=0.01, reliability_threshold=.4,
-                 default_variance=1.):
+                 default_variance=1., dtype=np.float64, refresh_period=1, stable_frames=None, static_mask=None):
         self.__number_of_gaussians = number_of_gaussians
         self.__learning_rate_alfa = learning_rate_alfa
         self.__depth_reliability_ro = depth_reliability_ro
@@ -699,187 +1264,423 @@ class Fast_RGBD_MoG:
         self.__depth_threshold = depth_threshold
         self.__reliability_threshold = reliability_threshold
         self.__default_variance = default_variance
+        self.__dtype = np.dtype(dtype)
 
         self.__height = rgb_im.shape[0]
         self.__width = rgb_im.shape[1]
-        self.__number_of_channels = 4
+        number_of_pixels = self.__height * self.__width
+        self.__stable_pixels = StablePixels(number_of_pixels, refresh_period, stable_frames, static_mask)
+        self.__frames_seen = 1
 
-        self.__current_yuv = RGB_to_YUV(rgb_im)
-        self.__current_depth = depth_im
+        if self.__dtype == np.float64:
+            self.__scratch = {"rgb": np.empty(rgb_im.shape), "yuv": np.empty(rgb_im.shape)}
+        else:
+            self.__scratch = {"yuv": np.empty(rgb_im.shape, dtype=np.int16)}
+        self.__scratch.update({"pixel_indexes": np.arange(number_of_pixels),
+                               "positions": np.empty([number_of_pixels, number_of_gaussians], dtype=int),
+                               "color_difference": np.empty([number_of_pixels, number_of_gaussians, 2], dtype=dtype),
+                               "color": np.empty([number_of_pixels, 2], dtype=dtype),
+                               "pixel_values": np.empty(number_of_pixels, dtype=dtype)})
+        for name in ["first", "second"]:
+            self.__scratch[name] = np.empty([number_of_pixels, number_of_gaussians], dtype=dtype)
+        for name in ["matching", "first_condition", "second_condition", "third_condition"]:
+            self.__scratch[name] = np.empty([number_of_pixels, number_of_gaussians], dtype=bool)
+        for name in ["no_depth", "pixel_condition", "background", "rank_condition"]:
+            self.__scratch[name] = np.empty(number_of_pixels, dtype=bool)
+
+        self.__current_yuv = self.convert_to_yuv(rgb_im)
+        self.__current_depth = depth_im.reshape(-1)
         self.__mask = np.zeros_like(depth_im)
 
-        self.__mean = np.zeros([self.__height * self.__width, 4, number_of_gaussians])
-        self.__variance = np.ones([self.__height * self.__width, 4, number_of_gaussians]) * self.__default_variance
-        self.__weight = np.ones_like(self.__mean) / number_of_gaussians
-        self.__depth_observations = np.ones([self.__height * self.__width, 2, number_of_gaussians])
+        self.__luminance_mean = np.empty([number_of_pixels, number_of_gaussians], dtype=dtype)
+        self.__color_mean = np.empty([number_of_pixels, number_of_gaussians, 2], dtype=dtype)
+        self.__depth_mean = np.empty([number_of_pixels, number_of_gaussians], dtype=dtype)
+        self.__luminance_variance = np.empty([number_of_pixels, number_of_gaussians], dtype=dtype)
+        self.__color_variance = np.empty([number_of_pixels, number_of_gaussians], dtype=dtype)
+        self.__depth_variance = np.empty([number_of_pixels, number_of_gaussians], dtype=dtype)
+        self.__weight = np.empty([number_of_pixels, number_of_gaussians], dtype=dtype)
+        self.__ranking = np.empty([number_of_pixels, number_of_gaussians], dtype=int)
+        self.__depth_observations = np.empty([number_of_pixels, number_of_gaussians, 2], dtype=int)
         self.initialization()
 
     def initialization(self):
-        self.__mean[:, :3, :] = self.__current_yuv.reshape(-1, 3)[:, :, np.newaxis]
-        self.__mean[:, 3, :] = self.__current_depth.flatten()[:, np.newaxis]
-        self.__depth_observations[:, 0, :] = np.where(self.__current_depth == 255, 0, 1).flatten()[:, np.newaxis]
-
-    def sort(self):
-        ranking = np.argmin(self.__weight / self.__variance, axis=2)
-        rank = np.c_[np.repeat(np.arange(self.__height * self.__width), 4),
-                     np.tile(np.arange(4), self.__height * self.__width),
-                     np.argmin(self.__weight / self.__variance, axis=2).flatten()]
-        # print(rank)
-        # self.__mean[rank[:, 0], rank[:, 1], rank[:, 2]] = 1.
-        return rank
-
-    def get_mask(self, rgb_im, depth_im):
-        self.__current_yuv = RGB_to_YUV(rgb_im).reshape(-1, 3)
-        self.__current_depth = depth_im.flatten()
-
-        # set ranking
-        ranking = self.sort()
-
-        # matching criterion
-        matching_criterion = self.get_matching_criterion()
-
-        # update
-        self.update(matching_criterion, ranking)
-
-        # get_mask
-        mask = self.set_mask(matching_criterion)
+        """Creating of gaussians
 
-        return mask
-        # self.__mean = np.where(
-        #     np.repeat(np.repeat(np.any(matching_criterion, axis=2)[:, :, np.newaxis], 4, axis=2)[:, :, :, np.newaxis],
-        #               self.__number_of_gaussians, axis=3), self.update_mean(matching_criterion), self.new_mean())
-
-    def update(self, matching_criterion, ranking):
-        self.__mean = np.where(np.bitwise_or.reduce(matching_criterion, axis=1)[:, np.newaxis, np.newaxis],
-                               self.update_mean(matching_criterion), self.new_mean(ranking))
-        self.__variance = np.where(np.bitwise_or.reduce(matching_criterion, axis=1)[:, np.newaxis, np.newaxis],
-                                   self.update_variance(matching_criterion), self.new_variance(ranking))
-        self.__weight = np.where(np.bitwise_or.reduce(matching_criterion, axis=1)[:, np.newaxis, np.newaxis],
-                                 self.update_weight(matching_criterion), self.new_weight(ranking))
-        self.__depth_observations = np.where(
-            np.bitwise_or.reduce(matching_criterion, axis=1)[:, np.newaxis, np.newaxis],
-            self.update_depth_observations(matching_criterion), self.new_depth_observations(ranking))
-
-    def update_mean(self, matching_criterion):
-        alpha = self.__learning_rate_alfa
-        new_data = np.c_[self.__current_yuv, self.__current_depth]
+        Means are the values of the first frame, variances are default_variance, weights are 1/number_of_gaussians.
+        Depth of pixels without depth (255) is unreliable.
+        """
+        self.__luminance_mean[...] = self.__current_yuv[:, 0, np.newaxis]
+        self.__color_mean[...] = self.__current_yuv[:, np.newaxis, 1:]
+        self.__depth_mean[...] = self.__current_depth[:, np.newaxis]
+        self.__luminance_variance.fill(self.__default_variance)
+        self.__color_variance.fill(self.__default_variance)
+        self.__depth_variance.fill(self.__default_variance)
+        self.__weight.fill(1 / self.__number_of_gaussians)
+        self.__ranking[...] = np.arange(self.__number_of_gaussians)
+        self.__depth_observations[:, :, 0] = np.where(self.__current_depth == 255, 0, 1)[:, np.newaxis]
+        self.__depth_observations[:, :, 1] = 1
+
+    def convert_to_yuv(self, rgb_im):
+        """Converting rgb image to YUV in preallocated array
 
-        new_mean = np.where(matching_criterion[:, np.newaxis],
-                            (1 - alpha) * self.__mean + alpha * new_data[:, :, np.newaxis], self.__mean)
-        return new_mean
+        Return:
+            yuv (np.ndarray): YUV values, [height * width, 3]
+        """
+        if self.__dtype != np.float64:
+            return RGB_to_YUV_fixed_point(rgb_im, out=self.__scratch["yuv"]).reshape(-1, 3)
+        np.copyto(self.__scratch["rgb"], rgb_im)
+        return RGB_to_YUV(self.__scratch["rgb"], out=self.__scratch["yuv"]).reshape(-1, 3)
 
-    def new_mean(self, r):
-        new_mean = np.copy(self.__mean)
-        new_mean[r[:, 0], r[:, 1], r[:, 2]] = np.c_[self.__current_yuv, self.__current_depth].flatten()
-        return new_mean
+    def sort(self):
+        """Sorting gaussians of every pixel by weight / luminance variance in descending order"""
+        rank = np.divide(np.negative(self.__weight, out=self.__scratch["first"]), self.__luminance_variance,
+                         out=self.__scratch["first"])
+        rank_in_place(rank, self.__ranking, self.__scratch)
 
-    def update_variance(self, matching_criterion):
-        alpha = self.__learning_rate_alfa
-        new_data = np.c_[self.__current_yuv, self.__current_depth]
+    def get_mask(self, rgb_im, depth_im, roi=None):
+        """Making mask of moving object
 
-        new_variance = np.where(matching_criterion[:, np.newaxis],
-                                (1 - alpha) * self.__variance + alpha * (new_data[:, :, np.newaxis] - self.__mean) ** 2,
-                                self.__variance)
-        return new_variance
+        Arguments:
+            rgb_im (np.ndarray): rgb image
+            depth_im (np.ndarray): depth image, 255 is for pixels without depth
+            roi (np.ndarray): region of interest, only its pixels are classified and updated, the others are background;
+                None for the whole image
 
-    def new_variance(self, r):
-        new_variance = np.copy(self.__variance)
-        new_variance[r[:, 0], r[:, 1], r[:, 2]] = self.__default_variance
-        return new_variance
+        Return:
+            mask (np.ndarray): mask, where 255 is for moving pixels
+        """
+        self.__current_yuv = self.convert_to_yuv(rgb_im)
+        self.__current_depth = depth_im.reshape(-1)
+        # frames are counted by detector, as pixels out of region of interest or stable ones aren't updated
+        self.__frames_seen += 1
+        number_of_observations = self.__frames_seen
+
+        stable_pixels = self.__stable_pixels.stable_pixels()
+        if stable_pixels is None and roi is None:
+            self.sort()
+            matching_criterion = self.get_matching_criterion()
+            self.update(matching_criterion, number_of_observations)
+            foreground = self.get_foreground(matching_criterion)
+        else:
+            foreground = self.get_sparse_foreground(stable_pixels, number_of_observations, roi)
+        self.__stable_pixels.update(foreground)
+        np.copyto(self.__mask, foreground.reshape(self.__height, self.__width))
+        np.multiply(self.__mask, 255, out=self.__mask)
+        return self.__mask
 
-    def update_weight(self, matching_criterion):
-        alpha = self.__learning_rate_alfa
+    def get_sparse_foreground(self, stable_pixels, number_of_observations, roi=None):
+        """Updating pixels of region of interest except stable ones, which match their best gaussian
 
-        new_weight = np.where(matching_criterion[:, np.newaxis],
-                              (1 - alpha) * self.__weight + alpha, self.__weight)
-        return new_weight
+        Arguments:
+            stable_pixels (np.ndarray): indexes of stable pixels, None for no stable pixels
+            number_of_observations (int): number of current observation
+            roi (np.ndarray): region of interest, None for the whole image
 
-    def new_weight(self, r):
-        new_weight = np.copy(self.__weight)
-        new_weight[r[:, 0], r[:, 1], r[:, 2]] = self.__learning_rate_alfa
-        return new_weight
+        Return:
+            foreground (np.ndarray): true for moving pixels, [height * width]
+        """
+        if roi is None:
+            updated = np.ones(self.__height * self.__width, dtype=bool)
+        else:
+            updated = np.array(roi, dtype=bool).reshape(-1)
+
+        if stable_pixels is not None:
+            stable_pixels = stable_pixels[updated[stable_pixels]]
+            model = self.select_pixels(stable_pixels, self.__ranking[stable_pixels, 0])
+            matching_best = self.get_matching_criterion()[:, 0]
+            self.restore_pixels(model)
+            updated[stable_pixels[matching_best]] = False
+        pixels = np.flatnonzero(updated)
+
+        model = self.select_pixels(pixels)
+        self.sort()
+        matching_criterion = self.get_matching_criterion()
+        self.update(matching_criterion, number_of_observations)
+        foreground = np.zeros_like(updated)
+        foreground[pixels] = self.get_foreground(matching_criterion)
+        self.restore_pixels(model, pixels)
+        return foreground
 
-    def update_depth_observations(self, matching_criterion):
-        new_depth_observations = np.copy(self.__depth_observations)
+    def select_pixels(self, pixels, gaussians=None):
+        """Working only with the chosen pixels
 
-        new_depth_observations[:, 0, :] = (1 - self.__learning_rate_alfa) * self.__depth_observations[:, 0, :] + \
-                                          (self.__learning_rate_alfa * (self.__current_depth < 255)).reshape(-1, 1)
-        new_depth_observations[:, 1, :] = self.__depth_observations[:, 1, :] + 1
-        return new_depth_observations
+        Parameters of gaussians and current values of the pixels are gathered and scratch arrays are replaced by their
+        beginnings, so the other methods work with them as with a smaller image. If only one gaussian of every pixel
+        is chosen, only get_matching_criterion may be used.
 
-    def new_depth_observations(self, r):
-        new_depth_observations = np.copy(self.__depth_observations)
-        new_r = np.unique((np.c_[r[:, 0], r[:, 2]]).astype(int), axis=0)
-        idx = np.arange(0, r.shape[0], 4)
-        new_r = np.c_[r[idx, 0], r[idx, 1]]
-        new_depth_observations[new_r[:, 0], 0, new_r[:, 1]] = self.__learning_rate_alfa * (self.__current_depth < 255)
-        new_depth_observations[new_r[:, 0], 1, new_r[:, 1]] = self.__depth_observations[new_r[:, 0], 1, new_r[:, 1]] + 1
-        return new_depth_observations
+        Arguments:
+            pixels (np.ndarray): indexes of pixels
+            gaussians (np.ndarray): index of the chosen gaussian of every pixel, None for all gaussians
 
-    def get_matching_criterion(self):
-        beta = self.__matching_rate_beta ** 2
-        matching_criterion = np.empty([self.__height * self.__width, self.__number_of_gaussians])
-        d_c_1 = (self.__current_depth[:, np.newaxis] - self.__mean[:, 3]) ** 2 < beta * self.__variance[:, 3]
-        d_c_2 = np.repeat([self.__current_depth == 255], self.__number_of_gaussians, axis=0).T
-        d_c_3 = self.__depth_observations[:, 0] / self.__depth_observations[:, 1] < self.__depth_reliability_ro
+        Return:
+            model (tuple): arrays of the whole image for restore_pixels
+        """
+        model = (self.gaussian_parameters(), self.__scratch, self.__current_yuv, self.__current_depth)
+        parameters, scratch, current_yuv, current_depth = model
+        number_of_pixels = pixels.shape[0]
+        if gaussians is None:
+            number_of_gaussians = self.__number_of_gaussians
+            self.set_gaussian_parameters([parameter[pixels] for parameter in parameters])
+        else:
+            number_of_gaussians = 1
+            self.set_gaussian_parameters([parameter[pixels, gaussians][:, np.newaxis] for parameter in parameters])
+
+        self.__scratch = {}
+        for name, array in scratch.items():
+            if name in ["rgb", "yuv"]:
+                continue
+            shape = (number_of_pixels,) + array.shape[1:]
+            if name in ["first", "second", "matching", "first_condition", "second_condition", "third_condition",
+                        "color_difference"]:
+                shape = (number_of_pixels, number_of_gaussians) + array.shape[2:]
+            self.__scratch[name] = array.reshape(-1)[:int(np.prod(shape))].reshape(shape)
+        self.__current_yuv, self.__current_depth = current_yuv[pixels], current_depth[pixels]
+        return model
+
+    def restore_pixels(self, model, pixels=None):
+        """Returning to the whole image after select_pixels
 
-        depth_matching = np.logical_or.reduce((d_c_1, d_c_2, d_c_3))
+        Arguments:
+            model (tuple): arrays returned by select_pixels
+            pixels (np.ndarray): indexes of pixels which parameters are scattered back, None if they aren't changed
+        """
+        parameters, self.__scratch, self.__current_yuv, self.__current_depth = model
+        if pixels is not None:
+            for parameter, pixels_parameter in zip(parameters, self.gaussian_parameters()):
+                parameter[pixels] = pixels_parameter
+        self.set_gaussian_parameters(parameters)
 
-        c_c_1 = np.logical_and(self.__mean[:, 0] > self.__luminance_min,
-                               np.repeat([self.__current_yuv[:, 0] > self.__luminance_min], self.__number_of_gaussians,
-                                         axis=0).T)
-        c_c_2 = self.__current_yuv[:, 0, np.newaxis] - self.__mean[:, 0] ** 2 < beta * self.__variance[:, 0]
-        c_c_3 = np.sum(self.__current_yuv[:, 1:, np.newaxis] - self.__mean[:, 1:3],
-                       axis=1) ** 2 < beta * self.__variance[:, 1]
+    def process(self, rgb_im, depth_im, out=None, roi=None):
+        """Making mask of the next frame
 
-        color_matching = np.where(c_c_1, np.add(c_c_2, c_c_3), c_c_2)
+        Arguments:
+            rgb_im (np.ndarray): current rgb image
+            depth_im (np.ndarray): current depth image, 255 is for pixels without depth
+            out (np.ndarray): array for mask; if None, the mask of detector is returned and is rewritten by next frame
+            roi (np.ndarray): region of interest, see get_mask
 
-        matching_criterion = np.bitwise_and(depth_matching, color_matching)
+        Return:
+            mask (np.ndarray): mask, where 255 is for moving pixels
+        """
+        mask = self.get_mask(rgb_im, depth_im, roi)
+        if out is None:
+            return mask
+        np.copyto(out, mask)
+        return out
 
-        return matching_criterion
+    def get_state(self):
+        """Parameters and model of detector for save_detector
 
-    def set_mask(self, matching_criterion):
-        mask = np.ones_like(self.__current_depth)
+        Return:
+            parameters (dict): arguments of constructor except images
+            model (dict): arrays of model by names
+        """
+        parameters = {"number_of_gaussians": self.__number_of_gaussians,
+                      "learning_rate_alfa": self.__learning_rate_alfa,
+                      "depth_reliability_ro": self.__depth_reliability_ro,
+                      "matching_rate_beta": self.__matching_rate_beta, "luminance_min": self.__luminance_min,
+                      "depth_threshold": self.__depth_threshold, "reliability_threshold": self.__reliability_threshold,
+                      "default_variance": self.__default_variance, "dtype": self.__dtype.name}
+        model = {"depth": self.__current_depth.reshape(self.__height, self.__width), "mask": self.__mask,
+                 "frames_seen": np.array(self.__frames_seen)}
+        model.update(zip(GAUSSIAN_PARAMETERS, self.gaussian_parameters()))
+        stable_parameters, stable_model = self.__stable_pixels.get_state()
+        parameters.update(stable_parameters)
+        model.update(stable_model)
+        return parameters, model
+
+    def set_state(self, model):
+        """Restoring model made by get_state
 
-        condition_1 = self.__depth_observations[:, 0] / self.__depth_observations[:, 1] > self.__depth_reliability_ro
-        condition_2 = np.bitwise_and(self.__weight[:, 3] > self.__depth_threshold, self.__mean[:, 3] < 255.)
-        condition = np.bitwise_and(condition_1, condition_2)
+        Arguments:
+            model (dict): arrays of model by names
+        """
+        self.__current_depth = np.copy(model["depth"]).reshape(-1)
+        np.copyto(self.__mask, model["mask"])
+        for name, parameter in zip(GAUSSIAN_PARAMETERS, self.gaussian_parameters()):
+            np.copyto(parameter, model[name], casting='unsafe')
+        self.__frames_seen = frames_seen(model)
+        self.__stable_pixels.set_state(model)
+
+    def gaussian_parameters(self):
+        """Arrays of parameters of gaussians in the order of GAUSSIAN_PARAMETERS"""
+        return [self.__luminance_mean, self.__color_mean, self.__depth_mean, self.__luminance_variance,
+                self.__color_variance, self.__depth_variance, self.__weight, self.__ranking, self.__depth_observations]
+
+    def set_gaussian_parameters(self, parameters):
+        """Replacing arrays of parameters of gaussians given in the order of GAUSSIAN_PARAMETERS"""
+        (self.__luminance_mean, self.__color_mean, self.__depth_mean, self.__luminance_variance, self.__color_variance,
+         self.__depth_variance, self.__weight, self.__ranking, self.__depth_observations) = parameters
 
-        temp_depth = np.copy(self.__mean[:, 3])
-        temp_depth[~condition] = 0.
+    def get_matching_criterion(self):
+        """Matching current values to gaussians
 
-        max_temp_depth = np.max(temp_depth, axis=1)
-        max_condition = np.equal(temp_depth, max_temp_depth[:, np.newaxis])
+        Return:
+            matching_criterion (np.ndarray): array of matching pixels to gaussians,
+                [height * width, number_of_gaussians]
+        """
+        scratch = self.__scratch
+        first, second = scratch["first"], scratch["second"]
+        beta = self.__matching_rate_beta ** 2
+        luminance = self.__current_yuv[:, 0, np.newaxis]
+        depth = self.__current_depth[:, np.newaxis]
+        no_depth = np.equal(self.__current_depth, 255, out=scratch["no_depth"])
+
+        np.subtract(depth, self.__depth_mean, out=first)
+        np.multiply(first, first, out=first)
+        depth_matching = np.less(first, np.multiply(self.__depth_variance, beta, out=second),
+                                 out=scratch["first_condition"])
+        np.divide(self.__depth_observations[:, :, 0], self.__depth_observations[:, :, 1], out=first)
+        unreliable_depth = np.less(first, self.__depth_reliability_ro, out=scratch["second_condition"])
+        np.logical_or(unreliable_depth, no_depth[:, np.newaxis], out=unreliable_depth)
+        np.logical_or(depth_matching, unreliable_depth, out=depth_matching)
+
+        color_condition_2 = scratch["second_condition"]
+        np.subtract(luminance, self.__luminance_mean, out=first)
+        np.multiply(first, first, out=first)
+        np.less(first, np.multiply(self.__luminance_variance, beta, out=second), out=color_condition_2)
+
+        color_condition_3 = scratch["third_condition"]
+        np.subtract(self.__current_yuv[:, np.newaxis, 1:], self.__color_mean, out=scratch["color_difference"])
+        np.sum(scratch["color_difference"], axis=2, out=first)
+        np.multiply(first, first, out=first)
+        np.less(first, np.multiply(self.__color_variance, beta, out=second), out=color_condition_3)
+
+        # the third condition is used only if both luminances are high enough
+        matching_criterion = scratch["matching"]
+        np.greater(self.__luminance_mean, self.__luminance_min, out=matching_criterion)
+        bright = np.greater(self.__current_yuv[:, 0], self.__luminance_min, out=scratch["pixel_condition"])
+        np.logical_and(matching_criterion, bright[:, np.newaxis], out=matching_criterion)
+        np.logical_and(matching_criterion, color_condition_3, out=color_condition_3)
+        np.logical_or(color_condition_2, color_condition_3, out=color_condition_2)
+
+        return np.logical_and(depth_matching, color_condition_2, out=matching_criterion)
+
+    def update(self, matching_criterion, number_of_observations):
+        """Updating gaussian parameters
 
-        depth_reliability = np.where(np.bitwise_and(condition, max_condition), True, False)
+        Matched gaussians are moved to the current values. If no gaussian of the pixel matches, the gaussian with the
+        lowest rank is replaced by a new one with the current values.
 
-        temp_weights = np.copy(self.__weight[:, 0])
-        weights_sum = np.zeros(temp_weights.shape[0])
+        Arguments:
+            matching_criterion (np.ndarray): array of matching pixels to gaussians
+            number_of_observations (int): number of current observation
+        """
+        scratch = self.__scratch
+        first, second, color_difference = scratch["first"], scratch["second"], scratch["color_difference"]
+        alpha = self.__learning_rate_alfa
+        luminance = self.__current_yuv[:, 0, np.newaxis]
+        color = self.__current_yuv[:, np.newaxis, 1:]
+        depth = self.__current_depth[:, np.newaxis]
+
+        def move_to_value(parameter, value):
+            np.multiply(parameter, 1 - alpha, out=second)
+            np.multiply(value, alpha, out=first)
+            np.add(second, first, out=parameter, where=matching_criterion)
+
+        np.subtract(luminance, self.__luminance_mean, out=first)
+        move_to_value(self.__luminance_variance, np.multiply(first, first, out=first))
+        move_to_value(self.__luminance_mean, luminance)
+
+        np.subtract(color, self.__color_mean, out=color_difference)
+        np.multiply(color_difference, color_difference, out=color_difference)
+        move_to_value(self.__color_variance, np.sum(color_difference, axis=2, out=first))
+        np.multiply(self.__color_mean, 1 - alpha, out=color_difference)
+        np.add(color_difference, np.multiply(self.__current_yuv[:, 1:], alpha, out=scratch["color"])[:, np.newaxis],
+               out=self.__color_mean, where=matching_criterion[:, :, np.newaxis])
+
+        # observations are integers, as in RGBD_MoG, so reliability is truncated
+        depth_reliability = np.multiply(np.less(self.__current_depth, 255, out=scratch["pixel_condition"]), alpha,
+                                        out=scratch["pixel_values"])
+        np.multiply(self.__depth_observations[:, :, 0], 1 - alpha, out=first)
+        np.add(first, depth_reliability[:, np.newaxis], out=first)
+        np.copyto(self.__depth_observations[:, :, 0], first, casting='unsafe', where=matching_criterion)
+        np.copyto(self.__depth_observations[:, :, 1], number_of_observations, where=matching_criterion)
+
+        np.subtract(depth, self.__depth_mean, out=first)
+        move_to_value(self.__depth_variance, np.multiply(first, first, out=first))
+        move_to_value(self.__depth_mean, depth)
+
+        np.multiply(self.__weight, 1 - alpha, out=second)
+        np.add(second, alpha, out=self.__weight, where=matching_criterion)
+
+        not_matched = np.logical_not(np.any(matching_criterion, axis=1, out=scratch["background"]),
+                                     out=scratch["background"])
+        pixels = np.flatnonzero(not_matched)
+        index = self.__ranking[pixels, -1]
+        self.__luminance_mean[pixels, index] = self.__current_yuv[pixels, 0]
+        self.__color_mean[pixels, index] = self.__current_yuv[pixels, 1:]
+        self.__depth_mean[pixels, index] = self.__current_depth[pixels]
+        self.__luminance_variance[pixels, index] = self.__default_variance
+        self.__color_variance[pixels, index] = self.__default_variance
+        self.__depth_variance[pixels, index] = self.__default_variance
+        self.__weight[pixels, index] = alpha
+        self.__depth_observations[pixels, index, 0] = (alpha * (self.__current_depth[pixels] < 255)).astype(int)
+        self.__depth_observations[pixels, index, 1] = number_of_observations
+
+    def get_foreground(self, matching_criterion):
+        """Choosing moving pixels
+
+        Pixel is background if it matches a reliable gaussian. In depth the reliable gaussian is the farthest one with
+        reliable observations and enough weight. In color it is the gaussian with the highest rank: as in RGBD_MoG, its
+        weight is accumulated until reliability_threshold is reached, so the others are never needed. Pixels without
+        depth and with low luminance are background.
 
-        for g in range(self.__number_of_gaussians):
-            temp_temp_weights = np.copy(temp_weights)
-            temp_temp_weights[np.arange(temp_weights.shape[0]), temp_weights.argmax(1)] = np.where(
-                weights_sum <= self.__reliability_threshold, -1,
-                temp_temp_weights[np.arange(temp_weights.shape[0]), temp_weights.argmax(1)])
-            weights_sum = np.where(weights_sum <= self.__reliability_threshold,
-                                   weights_sum + np.amax(temp_weights, axis=1),
-                                   weights_sum)
-            temp_weights = np.copy(temp_temp_weights)
-            if (weights_sum > self.__reliability_threshold).all():
-                break
+        Arguments:
+            matching_criterion (np.ndarray): array of matching pixels to gaussians
 
-        color_reliability = np.where(temp_weights == -1, True, False)
+        Return:
+            foreground (np.ndarray): true for moving pixels, [height * width]
+        """
+        scratch = self.__scratch
+        first = scratch["first"]
+        pixel_values, pixel_condition, background = \
+            scratch["pixel_values"], scratch["pixel_condition"], scratch["background"]
+
+        depth_reliability = scratch["first_condition"]
+        np.divide(self.__depth_observations[:, :, 0], self.__depth_observations[:, :, 1], out=first)
+        np.greater(first, self.__depth_reliability_ro, out=depth_reliability)
+        np.logical_and(depth_reliability, np.greater(self.__weight, self.__depth_threshold,
+                                                     out=scratch["second_condition"]), out=depth_reliability)
+        if not self.__depth_threshold < 255:
+            depth_reliability.fill(False)
+        first.fill(-np.inf)
+        np.copyto(first, self.__depth_mean, where=depth_reliability)
+        max_depth = np.max(first, axis=1, out=pixel_values)[:, np.newaxis]
+        np.logical_and(depth_reliability, np.equal(first, max_depth, out=scratch["second_condition"]),
+                       out=depth_reliability)
+        np.logical_and(depth_reliability, np.greater_equal(max_depth, 0, out=pixel_condition[:, np.newaxis]),
+                       out=depth_reliability)
+
+        color_reliability = scratch["third_condition"]
+        color_reliability.fill(False)
+        if self.__reliability_threshold > 0:
+            color_reliability[scratch["pixel_indexes"], self.__ranking[:, 0]] = True
+
+        np.logical_and(matching_criterion, color_reliability, out=color_reliability)
+        np.any(color_reliability, axis=1, out=background)
+        np.logical_and(matching_criterion, depth_reliability, out=depth_reliability)
+        np.logical_or(background, np.any(depth_reliability, axis=1, out=pixel_condition), out=background)
+
+        np.less_equal(self.__current_yuv[:, 0], self.__luminance_min, out=pixel_condition)
+        np.logical_and(pixel_condition, scratch["no_depth"], out=pixel_condition)
+        np.logical_or(background, pixel_condition, out=background)
+
+        return np.logical_not(background, out=background)
 
-        pixel_reliability = np.bitwise_and(self.__current_depth == 255,
-                                           self.__current_yuv[:, 0] <= self.__luminance_min)
+    def set_mask(self, matching_criterion):
+        """Making mask of moving object from get_foreground
 
-        final_condition_1 = np.bitwise_or.reduce(np.bitwise_and(matching_criterion, color_reliability), axis = 1)
-        final_condition_2 = np.bitwise_or.reduce(np.bitwise_and(matching_criterion, depth_reliability), axis = 1)
-        background = np.bitwise_or(final_condition_1, final_condition_2)
-        mask = np.where(background, 0, 255)
+        Arguments:
+            matching_criterion (np.ndarray): array of matching pixels to gaussians
 
-        mask = mask.reshape(self.__height, self.__width).astype(int)
-        return mask
+        Return:
+            mask (np.ndarray): mask, where 255 is for moving pixels
+        """
+        foreground = self.get_foreground(matching_criterion)
+        np.copyto(self.__mask, foreground.reshape(self.__height, self.__width))
+        np.multiply(self.__mask, 255, out=self.__mask)
+        return self.__mask
 
 
 def color_distance(current_pixel, sample_pixel):
@@ -917,13 +1718,340 @@ def get_random_neighbour(index, resolution, area):
     return neighbour_index
 
 
+def initial_background_samples(rgb_im, number_of_samples, area, rng=None):
+    """Filling background samples for the whole image
+
+    The first sample of every pixel is its own value, the others are values of random neighbours. Offsets of all
+    neighbours are generated at once and reflected at the borders of the image.
+
+    Arguments:
+        rgb_im (numpy.array): rgb image
+        number_of_samples (int): number of samples of every pixel
+        area (numpy.array): array which represents the area in which the neighbour will be chosen
+        rng (numpy.random.Generator): generator of random values
+
+    Return:
+        background (numpy.array): samples of background in the type of image, [height, width, number_of_samples, 3]
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    height, width = rgb_im.shape[0], rgb_im.shape[1]
+    random_block = rng.random((2, height, width, number_of_samples - 1))
+
+    i = np.broadcast_to(np.arange(height)[:, np.newaxis, np.newaxis], random_block.shape[1:])
+    j = np.broadcast_to(np.arange(width)[np.newaxis, :, np.newaxis], random_block.shape[1:])
+    neighbour_i = get_random_neighbours(i, height, area, random_block[0])
+    neighbour_j = get_random_neighbours(j, width, area, random_block[1])
+
+    background = np.empty([height, width, number_of_samples, 3], dtype=rgb_im.dtype)
+    background[:, :, 0] = rgb_im
+    background[:, :, 1:] = rgb_im[neighbour_i, neighbour_j]
+    return background
+
+
+def rank_in_place(keys, ranking, scratch):
+    """Indexes of gaussians of every pixel sorted by keys in ascending order, written to ranking
+
+    The same as np.argsort(keys, axis=1) with stable order of equal keys, but only preallocated arrays are used:
+    position of gaussian is the number of gaussians with less keys and of the previous ones with equal keys. It takes
+    number_of_gaussians ** 2 passes, which are cheap for the few gaussians of MoG detectors.
+
+    Arguments:
+        keys (np.ndarray): keys of gaussians, [number_of_pixels, number_of_gaussians]
+        ranking (np.ndarray): int array of the shape of keys for result
+        scratch (dict): "positions", int array of the shape of keys, and "rank_condition", bool array [number_of_pixels]
+    """
+    positions, condition = scratch["positions"], scratch["rank_condition"]
+    number_of_gaussians = keys.shape[1]
+    positions.fill(0)
+    for gaussian in range(number_of_gaussians):
+        for other in range(number_of_gaussians):
+            if other != gaussian:
+                compare = np.less_equal if other < gaussian else np.less
+                np.add(positions[:, gaussian], compare(keys[:, other], keys[:, gaussian], out=condition),
+                       out=positions[:, gaussian])
+    for gaussian in range(number_of_gaussians):
+        for position in range(number_of_gaussians):
+            np.copyto(ranking[:, position], gaussian, where=np.equal(positions[:, gaussian], position, out=condition))
+
+
+def create_sample_scratch(height, width, dtype=np.float64):
+    """Preallocated arrays for in_background_samples and batch modes of ViBE and DEVB
+
+    Arguments:
+        height, width (int): resolution of image
+        dtype (np.dtype): type of differences and distances
+
+    Return:
+        scratch (dict): arrays by names
+    """
+    scratch = {"difference": np.empty([height, width, 3], dtype=dtype),
+               "distance": np.empty([height, width], dtype=dtype),
+               "count": np.empty([height, width], dtype=int), "random_block": np.empty([6, height, width])}
+    for name in ["close", "background", "foreground", "update_pixel", "update_neighbour"]:
+        scratch[name] = np.empty([height, width], dtype=bool)
+    return scratch
+
+
+def create_roi_scratch(number_of_pixels, background, rgb_dtype, dtype=np.float64):
+    """Preallocated arrays for roi_background_samples
+
+    Arrays are made for the largest region of interest, the whole image, and their beginnings are used for smaller
+    ones.
+
+    Arguments:
+        number_of_pixels (int): number of pixels of image
+        background (numpy.array): samples of background, [height, width, number_of_samples, 3]
+        rgb_dtype (np.dtype): type of rgb images
+        dtype (np.dtype): type of differences and distances
+
+    Return:
+        scratch (dict): arrays by names, the first axis of every array is for pixels
+    """
+    scratch = {"samples": np.empty((number_of_pixels, 1) + background.shape[2:], dtype=background.dtype),
+               "values": np.empty([number_of_pixels, 1, 3], dtype=rgb_dtype),
+               "difference": np.empty([number_of_pixels, 1, 3], dtype=dtype),
+               "distance": np.empty([number_of_pixels, 1], dtype=dtype),
+               "count": np.empty([number_of_pixels, 1], dtype=int)}
+    for name in ["close", "background"]:
+        scratch[name] = np.empty([number_of_pixels, 1], dtype=bool)
+    return scratch
+
+
+def in_background_samples(background, rgb_im, threshold_r, threshold_lambda, scratch=None):
+    """Checking for belonging to background for the whole image
+
+    Pixel belongs to background if at least threshold_lambda of its samples are closer than threshold_r in the sense of
+    color_distance. All samples are counted, there is no early exit. Samples are compared one by one with the whole
+    image, so only arrays of the size of image are needed. Distances are calculated in the type of scratch arrays.
+
+    Arguments:
+        background (numpy.array): samples of background, [height, width, number_of_samples, 3]
+        rgb_im (numpy.array): current rgb image
+        threshold_r (float): threshold value of color vector in color space
+        threshold_lambda (int): threshold value for number of neighbours
+        scratch (dict): arrays made by create_sample_scratch; result is written to scratch["background"]
+
+    Return:
+        numpy.array: true for pixels which belong to background
+    """
+    if scratch is None:
+        scratch = create_sample_scratch(background.shape[0], background.shape[1])
+    difference, distance, close, count = scratch["difference"], scratch["distance"], scratch["close"], scratch["count"]
+
+    count.fill(0)
+    for k in range(background.shape[2]):
+        np.subtract(rgb_im, background[:, :, k], out=difference, dtype=difference.dtype)
+        np.multiply(difference, difference, out=difference)
+        np.add(difference[:, :, 0], difference[:, :, 1], out=distance)
+        np.add(distance, difference[:, :, 2], out=distance)
+        np.add(count, np.less(distance, threshold_r, out=close), out=count)
+    return np.greater_equal(count, threshold_lambda, out=scratch["background"])
+
+
+def roi_background_samples(background, rgb_im, roi, threshold_r, threshold_lambda, scratch):
+    """Checking for belonging to background only for pixels of region of interest
+
+    Samples and values of the pixels are gathered and checked by in_background_samples. Arrays for them are made by
+    create_roi_scratch on the first call and are kept in scratch["roi"].
+
+    Arguments:
+        background (numpy.array): samples of background, [height, width, number_of_samples, 3]
+        rgb_im (numpy.array): current rgb image
+        roi (numpy.array): region of interest
+        threshold_r (float): threshold value of color vector in color space
+        threshold_lambda (int): threshold value for number of neighbours
+        scratch (dict): arrays made by create_sample_scratch; result is written to scratch["background"], pixels of
+            region which don't belong to background are written to scratch["foreground"]
+
+    Return:
+        numpy.array: true for pixels of region which belong to background
+    """
+    if "roi" not in scratch or scratch["roi"]["values"].dtype != rgb_im.dtype:
+        scratch["roi"] = create_roi_scratch(roi.size, background, rgb_im.dtype, scratch["difference"].dtype)
+    pixels = np.flatnonzero(roi)
+    pixels_scratch = {name: array[:pixels.shape[0]] for name, array in scratch["roi"].items()}
+
+    # indexes are in the image, and "clip" mode writes to out without buffering
+    samples = np.take(background.reshape((-1,) + background.shape[2:]), pixels, axis=0,
+                      out=pixels_scratch["samples"][:, 0], mode="clip")
+    values = np.take(rgb_im.reshape(-1, 3), pixels, axis=0, out=pixels_scratch["values"][:, 0], mode="clip")
+    in_background = in_background_samples(samples[:, np.newaxis], values[:, np.newaxis], threshold_r,
+                                          threshold_lambda, pixels_scratch)[:, 0]
+    scratch["foreground"].fill(False)
+    scratch["foreground"].reshape(-1)[pixels] = np.logical_not(in_background, out=pixels_scratch["close"][:, 0])
+    scratch["background"].fill(False)
+    scratch["background"].reshape(-1)[pixels] = in_background
+    return scratch["background"]
+
+
+def update_background_samples(background, rgb_im, update_pixel, update_neighbour, random_block, area):
+    """Updating samples of background for the whole image
+
+    Random sample of every pixel in update_pixel is replaced with its current value; random sample of a random
+    neighbour of every pixel in update_neighbour is replaced with the value of the pixel. Index arrays of the updated
+    pixels are made for every call, about 1/time_factor of pixels of image.
+
+    Arguments:
+        background (numpy.array): samples of background, [height, width, number_of_samples, 3]
+        rgb_im (numpy.array): current rgb image
+        update_pixel (numpy.array): mask of pixels which samples are updated
+        update_neighbour (numpy.array): mask of pixels which neighbours samples are updated
+        random_block (numpy.array): uniform random values [0, 1) of shape [6, height, width]; rows 2, 3 choose samples,
+            rows 4, 5 choose neighbours
+        area (numpy.array): array which represents the area in which the neighbour will be chosen
+    """
+    number_of_samples = background.shape[2]
+
+    i, j = np.nonzero(update_pixel)
+    sample = (random_block[2, i, j] * number_of_samples).astype(int)
+    background[i, j, sample] = rgb_im[i, j]
+
+    i, j = np.nonzero(update_neighbour)
+    sample = (random_block[3, i, j] * number_of_samples).astype(int)
+    neighbour_i = get_random_neighbours(i, background.shape[0], area, random_block[4, i, j])
+    neighbour_j = get_random_neighbours(j, background.shape[1], area, random_block[5, i, j])
+    background[neighbour_i, neighbour_j, sample] = rgb_im[i, j]
+
+
+def get_random_neighbours(indexes, resolution, area, random_values):
+    """Get random indexes in neighbourhood area for array of indexes
+
+    Offset from area is chosen by random value; if index goes out of the picture, offset is reflected.
+
+    Arguments:
+        indexes (numpy.array): indexes which neighbours are chosen for
+        resolution (int): resolution of image
+        area (numpy.array): array which represents the area in which the neighbour will be chosen
+        random_values (numpy.array): uniform random values [0, 1) of the same shape as indexes
+    """
+    offsets = area[(random_values * area.shape[0]).astype(int)]
+    neighbour_indexes = indexes + offsets
+    outside = np.logical_or(neighbour_indexes < 0, neighbour_indexes >= resolution)
+    neighbour_indexes[outside] = indexes[outside] - offsets[outside]
+    return np.clip(neighbour_indexes, 0, resolution - 1)
+
+
+def label_regions(movement_mask, current_depth, depth_threshold=0.05, significant_number_of_points=100):
+    """Labelling of regions grown from moving pixels
+
+    Neighbour pixels (8-connectivity) with depth less than 1 are joined if difference of their depths is less than
+    depth_threshold; connected components of this graph are found in one pass. Components which contain seeds (moving
+    pixels with depth) and have more than significant_number_of_points pixels are regions. Regions are numbered from 1
+    in the order of region_growing: by the largest seed value. Seeds without depth (1 or more) start their own regions
+    and take close components, which weren't taken by earlier seeds.
+
+    Arguments:
+        movement_mask (np.array): a mask for seeds
+        current_depth (np.ndarray): array with current depth values
+        depth_threshold (float): threshold for depth difference which points on smothness of object
+        significant_number_of_points (int): number of points which indicates, that found object isn't a noise
+    Return:
+        labels (np.ndarray): image of labels of regions, 0 is for pixels out of regions
+        regions (list): Region for every label
+    """
+    from scipy.sparse import coo_matrix
+    from scipy.sparse.csgraph import connected_components
+    from scipy.ndimage import find_objects
+
+    height, width = current_depth.shape
+    indexes = np.arange(height * width).reshape(height, width)
+    seeds = movement_mask * current_depth
+    valid = current_depth < 1
+    lonely_seeds = np.logical_and(seeds != 0, np.logical_not(valid))
+
+    # edges between pixels with depth, and from seeds without depth to pixels with depth
+    first, second, attached_seeds, attached_pixels = [], [], [], []
+    for shift_i, shift_j in [(0, 1), (1, 0), (1, 1), (1, -1)]:
+        rows_a, rows_b = slice(0, height - shift_i), slice(shift_i, height)
+        columns_a = slice(max(-shift_j, 0), width - max(shift_j, 0))
+        columns_b = slice(max(shift_j, 0), width - max(-shift_j, 0))
+        valid_a, valid_b = valid[rows_a, columns_a], valid[rows_b, columns_b]
+        indexes_a, indexes_b = indexes[rows_a, columns_a], indexes[rows_b, columns_b]
+        close = np.abs(current_depth[rows_b, columns_b] - current_depth[rows_a, columns_a]) < depth_threshold
+
+        joined = np.logical_and(np.logical_and(valid_a, valid_b), close)
+        first.append(indexes_a[joined])
+        second.append(indexes_b[joined])
+        for seed, pixel, lonely, pixel_valid in [(indexes_a, indexes_b, lonely_seeds[rows_a, columns_a], valid_b),
+                                                 (indexes_b, indexes_a, lonely_seeds[rows_b, columns_b], valid_a)]:
+            attached = np.logical_and(np.logical_and(lonely, pixel_valid), close)
+            attached_seeds.append(seed[attached])
+            attached_pixels.append(pixel[attached])
+    first, second = np.concatenate(first), np.concatenate(second)
+    graph = coo_matrix((np.ones(first.shape[0], dtype=np.int8), (first, second)), shape=(height * width,) * 2)
+    number_of_components, components = connected_components(graph, directed=False)
+    sizes = np.bincount(components, minlength=number_of_components)
+
+    # seeds in order of decreasing value as region_growing picks them; every seed without depth starts a region, and
+    # only the first seed of every component does
+    seeds, valid = seeds.reshape(-1), valid.reshape(-1)
+    seed_pixels = np.flatnonzero(seeds)
+    seed_pixels = seed_pixels[np.lexsort((seed_pixels, -seeds[seed_pixels]))]
+    keys = np.where(valid[seed_pixels], components[seed_pixels], number_of_components + seed_pixels)
+    seed_pixels = seed_pixels[np.sort(np.unique(keys, return_index=True)[1])]
+    seed_valid = valid[seed_pixels]
+    number_of_seeds = seed_pixels.shape[0]
+
+    # owner is the number of seed which region took the component
+    owner = np.full(number_of_components + 1, number_of_seeds)
+    owner[components[seed_pixels[seed_valid]]] = np.flatnonzero(seed_valid)
+    attached_seeds = np.concatenate(attached_seeds)
+    attached_order = np.argsort(attached_seeds, kind='stable')
+    attached_seeds = attached_seeds[attached_order]
+    attached_components = components[np.concatenate(attached_pixels)[attached_order]]
+    for seed in np.flatnonzero(np.logical_not(seed_valid)):
+        start, stop = np.searchsorted(attached_seeds, seed_pixels[seed], side='left'), \
+            np.searchsorted(attached_seeds, seed_pixels[seed], side='right')
+        taken = attached_components[start:stop]
+        owner[taken[owner[taken] > seed]] = seed
+
+    alive = np.logical_not(seed_valid)
+    alive[seed_valid] = owner[components[seed_pixels[seed_valid]]] == np.flatnonzero(seed_valid)
+    # region of a seed is the components it took, or its own pixel for a seed without depth
+    taken_sizes = np.bincount(owner[:-1], weights=sizes, minlength=number_of_seeds + 1)[:-1]
+    region_sizes = taken_sizes + np.logical_not(seed_valid)
+    significant = np.logical_and(alive, region_sizes > significant_number_of_points)
+
+    seed_labels = np.zeros(number_of_seeds + 1, dtype=int)
+    seed_labels[:-1][significant] = np.arange(1, np.count_nonzero(significant) + 1)
+    labels = seed_labels[owner[components]]
+    labels[seed_pixels[np.logical_not(seed_valid)]] = seed_labels[:-1][np.logical_not(seed_valid)]
+    labels = labels.reshape(height, width)
+    number_of_regions = np.count_nonzero(significant)
+
+    number_of_points = np.bincount(labels.reshape(-1), minlength=number_of_regions + 1)
+    depth_sum = np.bincount(labels.reshape(-1), weights=current_depth.reshape(-1), minlength=number_of_regions + 1)
+    regions = []
+    for label, bbox in enumerate(find_objects(labels), start=1):
+        regions.append(Region(label=label, number_of_points=int(number_of_points[label]),
+                              bbox=(bbox[0].start, bbox[1].start, bbox[0].stop, bbox[1].stop),
+                              mean_depth=depth_sum[label] / number_of_points[label]))
+    return labels, regions
+
+
+def region_masks(labels, regions, dtype=float):
+    """Masks of regions one by one
+
+    Arguments:
+        labels (np.ndarray): image of labels made by label_regions
+        regions (list): regions made by label_regions
+        dtype (np.dtype): type of masks
+
+    Return:
+        generator of np.ndarray: mask of every region, where 1 is for pixels of region
+    """
+    for region in regions:
+        yield (labels == region.label).astype(dtype)
+
+
 def region_growing(movement_mask, current_depth, depth_threshold=0.05, significant_number_of_points=100):
     """Region growing realization
 
     Pixel, that was checked as "moving", with the largest value is choosing as seed. From that seed performing a
     region growing - if value of neighbour pixels is close to the seed value they are adding to the region and the
     next growing will be performing from these values.
-    Algorithm works until there are seeds.
+    Regions are found by label_regions in one pass.
 
     Arguments:
         movement_mask (np.array): a mask for seeds
@@ -933,48 +2061,148 @@ def region_growing(movement_mask, current_depth, depth_threshold=0.05, significa
     Return:
         mask (np.array): a mask of moving objects
     """
-    masks = []
-    seeds = movement_mask * current_depth
-    done = np.zeros_like(seeds)
-
-    while not np.sum(seeds) == 0:
-        ind_i = math.floor(np.argmax(seeds) / current_depth.shape[1])
-        ind_j = np.argmax(seeds) - ind_i * current_depth.shape[1]
-        mask = np.zeros_like(current_depth)
-
-        q = deque()
-
-        q.append([ind_i, ind_j])
-        seeds[ind_i, ind_j] = 0
-        done[ind_i, ind_j] = 1
-        mask[ind_i, ind_j] = 1
-
-        while q:
-            ind = q.popleft()
-            for i in range(ind[0] - 1, ind[0] + 2):
-                for j in range(ind[1] - 1, ind[1] + 2):
-                    if -1 < i < current_depth.shape[0] and -1 < j < current_depth.shape[1]:
-                        if not done[i, j] == 1 and not current_depth[i, j] >= 1:
-                            if math.fabs(
-                                    current_depth[i, j] - current_depth[ind[0], ind[1]]) < depth_threshold:
-                                q.append([i, j])
-                                seeds[i, j] = 0
-                                done[i, j] = 1
-                                mask[i, j] = 1
-        if np.sum(mask) > significant_number_of_points:
-            masks.append(mask)
-    return masks
-
-
-def RGB_to_YUV(rgb):
+    labels, regions = label_regions(movement_mask, current_depth, depth_threshold, significant_number_of_points)
+    return list(region_masks(labels, regions, current_depth.dtype))
+
+
+def RGB_to_YUV(rgb, out=None):
     """
     T-REC-T.871 recommendation
     code from https://gist.github.com/Quasimondo/c3590226c924a06b276d606f4f189639
+
+    Arguments:
+        rgb (np.ndarray): rgb image; must be float64 if out is used
+        out (np.ndarray): float64 array of the shape of rgb for result
     """
     m = np.array([[0.29900, -0.16874, 0.50000],
                   [0.58700, -0.33126, -0.41869],
                   [0.11400, 0.50000, -0.08131]])
 
-    yuv = np.dot(rgb, m)
+    if out is None:
+        yuv = np.dot(rgb, m)
+    else:
+        yuv = np.dot(rgb, m, out=out)
     yuv[:, :, 1:] += 128.0
     return yuv
+
+
+def RGB_to_YUV_fixed_point(rgb, out=None):
+    """RGB_to_YUV in fixed point arithmetic
+
+    Coefficients of RGB_to_YUV are rounded to 1/2^14 and the sums are made in int32, so the result is RGB_to_YUV
+    rounded to integers (differences are not more than 1). Images of other types than uint8 would be truncated to
+    integers, so they are converted by RGB_to_YUV and rounded.
+
+    Arguments:
+        rgb (np.ndarray): rgb image, uint8
+        out (np.ndarray): int16 array of the shape of rgb for result
+    Return:
+        yuv (np.ndarray): YUV image, int16
+    """
+    if rgb.dtype != np.uint8:
+        yuv = np.rint(RGB_to_YUV(np.asarray(rgb, dtype=np.float64)))
+    else:
+        m = np.array([[4899, -2765, 8192],
+                      [9617, -5427, -6860],
+                      [1868, 8192, -1332]], dtype=np.int32)
+
+        yuv = np.dot(rgb.astype(np.int32), m)
+        yuv += 1 << 13
+        yuv >>= 14
+        yuv[:, :, 1:] += 128
+    if out is None:
+        return yuv.astype(np.int16)
+    np.copyto(out, yuv, casting='unsafe')
+    return out
+
+
+def create_detector(detector_class, rgb_im, depth_im=None, **parameters):
+    """Creating detector of any class of this module
+
+    Arguments:
+        detector_class (type): class of detector
+        rgb_im (np.ndarray): first rgb image
+        depth_im (np.ndarray): first depth image, not used by detectors which work only with color
+        parameters: parameters of detector
+
+    Return:
+        detector: instance of detector_class
+    """
+    if detector_class is FrameDifference:
+        return detector_class(depth_im, rgb_im, **parameters)
+    if detector_class in (ViBЕ, RGB_MoG):
+        return detector_class(rgb_im, **parameters)
+    return detector_class(rgb_im, depth_im, **parameters)
+
+
+def get_rng_state(rng):
+    """State of generator of random values as an array with json string"""
+    return np.array(json.dumps(rng.bit_generator.state))
+
+
+def set_rng_state(rng, state):
+    """Restoring state of generator of random values made by get_rng_state"""
+    rng.bit_generator.state = json.loads(str(state))
+
+
+def frames_seen(model):
+    """Number of frames seen by MoG detector of model made by get_state
+
+    Checkpoints without the counter have the latest observation of gaussians, which is the counter if any gaussian was
+    updated in the last frame.
+    """
+    if "frames_seen" in model:
+        return int(model["frames_seen"])
+    return int(np.max(model["depth_observations"][..., 1]))
+
+
+def save_detector(detector, file_name):
+    """Saving the whole state of detector to .npz file
+
+    Checkpoint contains CHECKPOINT_VERSION, name of class, parameters of constructor as json and arrays of model from
+    get_state, so load_detector continues from the same state. File is written by the name as it is, without adding
+    .npz.
+
+    Arguments:
+        detector: detector from moving_detection
+        file_name (str): name of file
+    """
+    if not callable(getattr(detector, "get_state", None)):
+        raise TypeError(type(detector).__name__ + " has no model to save")
+    # state is taken before the file is created, so detectors without it don't leave broken checkpoints
+    parameters, model = detector.get_state()
+    # np.savez appends .npz to names without it, so the file is opened here
+    with open(file_name, "wb") as file:
+        np.savez(file, version=CHECKPOINT_VERSION, detector=type(detector).__name__,
+                 parameters=json.dumps(parameters), **model)
+
+
+def load_detector(file_name, detector=None):
+    """Loading detector saved by save_detector
+
+    New detector is created with saved parameters; frames of checkpoint give the shapes to the constructor and the
+    model is restored by set_state. If detector is given, only its model is replaced, so a trained model can be shared
+    with a detector of the same parameters in another process.
+
+    Arguments:
+        file_name (str): name of file
+        detector: existing detector for the model, None for a new one
+
+    Return:
+        detector: detector with the saved state
+    """
+    with np.load(file_name) as checkpoint:
+        version = int(checkpoint["version"])
+        if version != CHECKPOINT_VERSION:
+            raise ValueError("checkpoint version " + str(version) + " is not supported, expected " +
+                             str(CHECKPOINT_VERSION))
+        detector_class = globals()[str(checkpoint["detector"])]
+        parameters = json.loads(str(checkpoint["parameters"]))
+        model = {name: checkpoint[name] for name in checkpoint.files if
+                 name not in ["version", "detector", "parameters"]}
+
+    if detector is None:
+        rgb_im = model["rgb"] if "rgb" in model else np.zeros(model["depth"].shape + (3,), dtype=np.uint8)
+        detector = create_detector(detector_class, rgb_im, model.get("depth"), **parameters)
+    detector.set_state(model)
+    return detector
@@ -668,7 +668,9 @@ def find_observations(objects, initial_center):
     for i in range(len(objects) - 1):
         source_points = objects[i].get_points()[0]
         target_points = objects[i + 1].get_points()[0]
-        transformation = open3d_icp.get_transformation_matrix_p2p(source_points, target_points)
+        # clouds of objects are cached with their normals, so every object is converted and gets normals once
+        transformation = open3d_icp.get_transformation_matrix_p2p(objects[i].get_point_cloud(),
+                                                                  objects[i + 1].get_point_cloud())
         current_transformation = transformation.dot(previous_transformation)
         previous_transformation = np.copy(current_transformation)
         found_rotations[i] = get_angles_from_transformation(current_transformation[:3, :3])
@@ -3,33 +3,47 @@ import numpy as np
 import copy
 
 
+def to_point_cloud(points, colors=None):
+    """Open3d point cloud of points, clouds like PointsObject.get_point_cloud() are used as they are"""
+    if isinstance(points, o3d.geometry.PointCloud):
+        return points
+    pcd = o3d.geometry.PointCloud()
+    pcd.points = o3d.utility.Vector3dVector(points)
+    if colors is not None:
+        pcd.colors = o3d.utility.Vector3dVector(colors)
+    return pcd
+
+
 def get_transformation_matrix_p2p(source_points, target_points, distance_threshold=1,
                                   init_transformation=np.identity(4)):
-    source = o3d.geometry.PointCloud()
-    target = o3d.geometry.PointCloud()
-    source.points = o3d.utility.Vector3dVector(source_points)
-    target.points = o3d.utility.Vector3dVector(target_points)
+    """Point to plane ICP
+
+    Points are arrays or open3d point clouds. Clouds with normals, like PointsObject.get_point_cloud(), are
+    registered as they are; normals of other clouds are estimated on their copies, so clouds of callers aren't changed.
+    """
+    source = to_point_cloud(source_points)
+    target = to_point_cloud(target_points)
 
-    source.estimate_normals(o3d.geometry.KDTreeSearchParamHybrid(radius=0.1, max_nn=30))
-    target.estimate_normals(o3d.geometry.KDTreeSearchParamHybrid(radius=0.1, max_nn=30))
+    clouds = []
+    for pcd, points in ((source, source_points), (target, target_points)):
+        if not pcd.has_normals():
+            if pcd is points:
+                pcd = o3d.geometry.PointCloud(pcd)
+            pcd.estimate_normals(o3d.geometry.KDTreeSearchParamHybrid(radius=0.1, max_nn=30))
+        clouds.append(pcd)
+    source, target = clouds
     reg_p2p = o3d.registration.registration_icp(source, target, distance_threshold, init_transformation,
                                                 o3d.registration.TransformationEstimationPointToPlane())
 
-    source_temp = copy.deepcopy(source)
-    source_temp.transform(reg_p2p.transformation)
-    # o3d.visualization.draw_geometries([source_temp, target])
+    # o3d.visualization.draw_geometries([copy.deepcopy(source).transform(reg_p2p.transformation), target])
 
     return reg_p2p.transformation
 
 
 def get_transformation_matrix_cp2p(source_points, target_points, source_color, target_color, distance_threshold=1,
                                    init_transformation=np.identity(4), radius=0.05):
-    source = o3d.geometry.PointCloud()
-    target = o3d.geometry.PointCloud()
-    source.points = o3d.utility.Vector3dVector(source_points)
-    source.colors = o3d.utility.Vector3dVector(source_color)
-    target.points = o3d.utility.Vector3dVector(target_points)
-    target.colors = o3d.utility.Vector3dVector(target_color)
+    source = to_point_cloud(source_points, source_color)
+    target = to_point_cloud(target_points, target_color)
 
     source_down = source.voxel_down_sample(radius)
     target_down = target.voxel_down_sample(radius)
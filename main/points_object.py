@@ -3,31 +3,62 @@ import open3d as o3d
 from scipy.spatial.transform import Rotation as R
 
 
+def grow_buffer(buffer, capacity, size):
+    """New buffer of capacity rows with the first size rows of buffer"""
+    new_buffer = np.empty((capacity,) + buffer.shape[1:], dtype=buffer.dtype)
+    new_buffer[:size] = buffer[:size]
+    return new_buffer
+
+
 class PointsObject:
     """Point clouds type objects
 
+    Points are kept in buffers, which are at least doubled when they are full, so adding of points batch by batch takes
+    linear time. Arrays of points are views of the first number_of_all_points rows of buffers. Active points are kept
+    as sorted indexes, and their coordinates, colors and normals are gathered only when the points or the active subset
+    change.
+
     Attributes:
         xyz (numpy.array): an array for active xyz coordinates of the object
         rgb (numpy.array): an array for active rgb value (.0, 1.0) of the points of the object
         visible (bool): shows should the object be using or not
         moving (bool): shows should the object move
-        active_points (numpy.array): shows which points will be active
+        active_points (numpy.array): sorted indexes of active points
+        buffers (dict): buffers of "xyz", "rgb", "normals" and "active_points" by names
+        size (int): number of points in buffers
+        number_of_active (int): number of indexes in the buffer of active points
+        active (dict): cached read-only arrays of active "xyz", "rgb" and "normals", they are dropped when the points
+            or the active subset change
+        rng (np.random.Generator): generator of random active subsets made of seed, global np.random if seed is None,
+            so np.random.seed() makes the subsets reproducible
+        open3d (dict): cached open3d "cloud" of all points, its "kd_tree", "active_cloud" selected from it and flag
+            "normals", which is True if the cloud has normals of the object; they are dropped when the points or the
+            active subset change
+        pending_normals (list): start, stop, center of view and radius of every batch of points, whose normals weren't
+            estimated yet; they are estimated on the first access to normals
+        center (numpy.array): cached mean of all points, None if it wasn't calculated
+        transformation (numpy.array): [4, 4] matrix of transformation, which wasn't applied to points yet, None if
+            there is no such transformation
     """
 
     def __hash__(self) -> int:
         return super().__hash__()
 
-    def __init__(self, xyz=None, rgb=None, camera_position=None, radius_for_normals=0.2, number=None):
-        self.__xyz = np.zeros([0, 3])
-        self.__rgb = np.zeros([0, 3])
-        self.__normals = np.zeros([0, 3])
-        self.__active_points = np.empty([0], dtype=bool)
+    def __init__(self, xyz=None, rgb=None, camera_position=None, radius_for_normals=0.2, number=None, normals=None,
+                 seed=None):
+        self.__buffers = {"xyz": np.zeros([0, 3]), "rgb": np.zeros([0, 3]), "normals": np.zeros([0, 3]),
+                          "active_points": np.empty([0], dtype=np.intp)}
+        self.__rng = np.random if seed is None else np.random.default_rng(seed)
+        self.set_size(0, 0)
+        self.__pending_normals = []
+        self.__center = None
+        self.__transformation = None
         if xyz is not None:
-            self.set_points(xyz, rgb, number, camera_position, radius_for_normals)
+            self.set_points(xyz, rgb, number, camera_position, radius_for_normals, normals)
         self.__visible = True
         self.__moving = False
 
-    def add_points(self, xyz, rgb=None, number=None, center_of_view=None, radius=0.1):
+    def add_points(self, xyz, rgb=None, number=None, center_of_view=None, radius=0.1, normals=None):
         """Adding points to xyz and rgb
 
         If user didn't send rgb, it is made grey by default. If user doesn't point the number of active points they all
@@ -39,28 +70,45 @@ class PointsObject:
             number (int): number of active points
             center_of_view (numpy.array): point of view from camera
             radius (float): radius of searching neighbourhood points
+            normals (numpy.array): normals of the points to add, e.g. from image_processing.grid_normals; if None,
+                they are estimated for the added points on the first access to normals
         """
         try:
-            self.__xyz = np.append(self.__xyz, xyz, axis=0)
-
             if rgb is None or not rgb.shape[0] == xyz.shape[0]:
                 rgb = np.empty([xyz.shape[0], 3])
                 rgb.fill(0.5)
 
-            self.__normals = np.append(self.__normals, self.calculate_normals(center_of_view, radius), axis=0)
-            self.__rgb = np.append(self.__rgb, rgb, axis=0)
+            # normals, which aren't given, are NaN until they are estimated
+            estimate_normals = normals is None
+            if estimate_normals:
+                normals = np.nan
+            elif center_of_view is not None:
+                normals = self.get_positive_normals(normals, center_of_view, xyz)
 
             if number is not None and number > xyz.shape[0]:
                 print("Number of active points is more, than number of points. Do something with it.")
                 number = None
 
-            self.__active_points = np.append(self.__active_points, self.choose_random_active(xyz.shape[0], number),
-                                             axis=0)
+            self.apply_transformation()
+            start, stop = self.__size, self.__size + xyz.shape[0]
+            self.reserve(stop)
+            self.__buffers["xyz"][start:stop] = xyz
+            self.__buffers["rgb"][start:stop] = rgb
+            self.__buffers["normals"][start:stop] = normals
+            new_active = self.choose_random_active(xyz.shape[0], number) + start
+            self.__buffers["active_points"][self.__number_of_active:self.__number_of_active + new_active.shape[0]] = \
+                new_active
+            self.set_size(stop, self.__number_of_active + new_active.shape[0])
+
+            if estimate_normals:
+                self.__pending_normals.append([start, stop, None if center_of_view is None else
+                                               np.array(center_of_view, dtype=float), radius])
+            self.__center = None
 
         except ValueError as e:
             print("Error in PointObject.add_points:", e)
 
-    def set_points(self, xyz, rgb=None, number=None, center_of_view=None, radius=0.1):
+    def set_points(self, xyz, rgb=None, number=None, center_of_view=None, radius=0.1, normals=None):
         """Setting xyz and rgb points
 
         If user didn't send rgb, it is made grey by default
@@ -71,24 +119,49 @@ class PointsObject:
             number (int): number of active points
             center_of_view (numpy.array): point of view from camera
             radius (float): radius of searching neighbourhood points
+            normals (numpy.array): normals of the points, e.g. from image_processing.grid_normals; if None, they are
+                estimated
         """
-        try:
-            self.__xyz = xyz
-            if rgb is None or not rgb.shape[0] == xyz.shape[0]:
-                rgb = np.empty([xyz.shape[0], 3])
-                rgb.fill(0.5)
-            self.__rgb = rgb
-            self.__normals = self.calculate_normals(center_of_view, radius)
-        except ValueError as e:
-            print("Error in PointObject.set_points:", e)
+        self.clear()
+        self.add_points(xyz, rgb, number, center_of_view, radius, normals)
 
-        self.__active_points = self.choose_random_active(xyz.shape[0], number)
+    def reserve(self, number_of_points):
+        """Growing buffers, so they can keep number_of_points points without reallocation
+
+        Arguments:
+            number_of_points (int): number of points to keep
+        """
+        capacity = self.__buffers["xyz"].shape[0]
+        if number_of_points <= capacity:
+            return
+        capacity = max(number_of_points, 2 * capacity)
+        for name, buffer in self.__buffers.items():
+            self.__buffers[name] = grow_buffer(buffer, capacity, self.__size)
+        self.set_size(self.__size, self.__number_of_active)
+
+    def set_size(self, size, number_of_active):
+        """Setting number of points, number of active points and views of buffers"""
+        self.__size = size
+        self.__number_of_active = number_of_active
+        self.__xyz = self.__buffers["xyz"][:size]
+        self.__rgb = self.__buffers["rgb"][:size]
+        self.__normals = self.__buffers["normals"][:size]
+        self.__active_points = self.__buffers["active_points"][:number_of_active]
+        self.__active = {}
+        self.__open3d = {}
+
+    def get_active(self, name):
+        """Read-only array of active rows of "xyz", "rgb" or "normals", it is cached until they change"""
+        if name not in self.__active:
+            self.apply_transformation()
+            active = np.take(self.__buffers[name], self.__active_points, axis=0)
+            active.flags.writeable = False
+            self.__active[name] = active
+        return self.__active[name]
 
     def get_points(self):
-        """Returns coordinates and colors of active object's points"""
-        xyz = self.__xyz[self.__active_points]
-        rgb = self.__rgb[self.__active_points]
-        return xyz, rgb
+        """Returns coordinates and colors of active object's points, arrays are cached and read-only"""
+        return self.get_active("xyz"), self.get_active("rgb")
 
     @property
     def visible(self):
@@ -107,17 +180,16 @@ class PointsObject:
         self.__moving = moving
 
     def rotate(self, angles):
-        """Rotating points of the object
+        """Rotating points of the object around their center
 
         Args:
-            axis (numpy.array): axis according to which rotation must be done
-            angle (numpy.array): angle on which rotation must be done
+            angles (numpy.array): angles of rotation around x, y and z axes in degrees
         """
         center = self.get_center()
-        self.shift(-center)
-        r = R.from_euler('xyz', angles, degrees=True)
-        self.__xyz = r.apply(self.__xyz)
-        self.shift(center)
+        matrix = np.identity(4)
+        matrix[:3, :3] = R.from_euler('xyz', angles, degrees=True).as_matrix()
+        matrix[:3, 3] = center - matrix[:3, :3] @ center
+        self.transform(matrix)
 
     def shift(self, distance):
         """Linear moving of points of the object
@@ -125,7 +197,9 @@ class PointsObject:
         Arguments:
             distance (numpy.array): distance in xyz format according to which points must be moved
         """
-        self.__xyz = self.__xyz + distance
+        matrix = np.identity(4)
+        matrix[:3, 3] = distance
+        self.transform(matrix)
 
     def scale(self, S):
         """Scaling of point cloud
@@ -133,21 +207,57 @@ class PointsObject:
         Arguments:
             S (float): scaling coefficient
         """
+        self.transform(np.diag([S, S, S, 1.]))
 
-        matrix = np.array([[S, 0, 0, 0],
-                           [0, S, 0, 0],
-                           [0, 0, S, 0],
-                           [0, 0, 0, 1]])
-
-        A = np.zeros((self.__xyz.shape[0], self.__xyz.shape[1] + 1))
-        A[:, :-1] = self.__xyz[:, :]
+    def transform(self, matrix):
+        """Transforming points of the object by homogeneous matrix
 
-        A = np.dot(matrix, A.T).T
+        Transformation isn't applied at once, it is multiplied with the pending one, so a chain of rotations, shifts
+        and scalings is applied to points in one pass when they are read. Singular matrices, like scale(0), collapse
+        points and leave their normals as they are.
 
-        self.__xyz = A[:, :-1]
+        Arguments:
+            matrix (numpy.array): [4, 4] matrix of affine transformation, e.g. from open3d_icp
+        """
+        matrix = np.array(matrix, dtype=float)
+        self.__transformation = matrix if self.__transformation is None else matrix @ self.__transformation
+        if self.__center is not None:
+            self.__center = matrix[:3, :3] @ self.__center + matrix[:3, 3]
+        self.__active.pop("xyz", None)
+        self.__active.pop("normals", None)
+        self.__open3d = {}
+
+    def apply_transformation(self):
+        """Applying pending transformation to points, normals and points of view of normals, which weren't estimated"""
+        if self.__transformation is None:
+            return
+        rotation, translation = self.__transformation[:3, :3], self.__transformation[:3, 3]
+        self.__transformation = None
+
+        np.matmul(self.__xyz, rotation.T, out=self.__xyz)
+        self.__xyz += translation
+
+        # normals are transformed by inverse transposed matrix, so they stay orthogonal to surfaces; for rotations
+        # with uniform scaling it is the rotation, otherwise normals are normalized; singular matrices, like scale(0),
+        # collapse surfaces, so normals are left as they are
+        if np.linalg.matrix_rank(rotation) == 3:
+            square_scale = np.trace(rotation @ rotation.T) / 3
+            normals_matrix = np.linalg.inv(rotation)
+            if np.allclose(rotation @ rotation.T, square_scale * np.identity(3)):
+                np.matmul(self.__normals, normals_matrix * np.sqrt(square_scale), out=self.__normals)
+            else:
+                np.matmul(self.__normals, normals_matrix, out=self.__normals)
+                self.__normals /= np.linalg.norm(self.__normals, axis=1)[:, np.newaxis]
+
+        # neighbourhoods of normals, which weren't estimated yet, are scaled with points
+        linear_scale = np.abs(np.linalg.det(rotation)) ** (1 / 3)
+        for pending in self.__pending_normals:
+            if pending[2] is not None:
+                pending[2] = rotation @ pending[2] + translation
+            pending[3] = pending[3] * linear_scale
 
     def number_of_active_points(self):
-        return np.sum(self.__active_points)
+        return self.__number_of_active
 
     def number_of_all_points(self):
         return self.__xyz.shape[0]
@@ -160,30 +270,26 @@ class PointsObject:
             number (int): number of points which will be chosen as active
 
         Returns:
-            new_active (np.array): array of indicators which show is an element active or not
+            new_active (np.array): sorted indexes of active elements, all indexes if number is None
         """
-        new_active = np.empty(array_len)
         if number is None:
-            new_active.fill(True)
-        else:
-            true_active = np.empty([number])
-            true_active.fill(True)
-            false_active = np.empty([array_len - number])
-            false_active.fill(False)
-            new_active = np.append(true_active, false_active)
-            np.random.shuffle(new_active)
-        return new_active.astype(bool)
+            return np.arange(array_len)
+        return np.sort(self.__rng.choice(array_len, number, replace=False))
 
     def clear(self):
-        """Erases points"""
-        self.__xyz = np.zeros([0, 3])
-        self.__rgb = np.zeros([0, 3])
-        self.__active_points = np.zeros([0])
+        """Erases points, buffers are kept for new points"""
+        self.set_size(0, 0)
+        self.__pending_normals = []
+        self.__center = None
+        self.__transformation = None
 
     def set_number_of_active_points(self, number):
-        self.__active_points = self.choose_random_active(self.number_of_all_points(), number)
+        new_active = self.choose_random_active(self.number_of_all_points(), number)
+        self.__buffers["active_points"][:new_active.shape[0]] = new_active
+        self.set_size(self.__size, new_active.shape[0])
 
     def return_n_last_points(self, number):
+        self.apply_transformation()
         return self.__xyz[-(number + 1):-1], self.__rgb[-(number + 1):-1]
 
     def save_all_points(self, path, name):
@@ -193,15 +299,11 @@ class PointsObject:
             path (string): path to the file. Folders have to exist
             name (string): name of the file
         """
-        import open3d as o3d
         from pathlib import Path
 
         Path(path).mkdir(parents=True, exist_ok=True)
         full_path = path + "/" + name + ".pcd"
-        pcd = o3d.geometry.PointCloud()
-        pcd.points = o3d.utility.Vector3dVector(self.__xyz)
-        pcd.colors = o3d.utility.Vector3dVector(self.__rgb)
-        o3d.io.write_point_cloud(full_path, pcd)
+        o3d.io.write_point_cloud(full_path, self.get_point_cloud(all_points=True))
 
     def save_active_points(self, path, name):
         """Saving only active points cloud's points in .pcd format
@@ -213,36 +315,119 @@ class PointsObject:
         from pathlib import Path
 
         Path(path).mkdir(parents=True, exist_ok=True)
-        xyz, rgb = self.get_points()
-
         full_path = path + "/" + name + ".pcd"
-        pcd = o3d.geometry.PointCloud()
-        pcd.points = o3d.utility.Vector3dVector(xyz)
-        pcd.colors = o3d.utility.Vector3dVector(rgb)
-        o3d.io.write_point_cloud(full_path, pcd)
+        o3d.io.write_point_cloud(full_path, self.get_point_cloud())
+
+    def get_cloud(self):
+        """Open3d point cloud of all points and colors, it is converted once and cached until the points change
+
+        The cloud carries the object's normals after get_point_cloud() is called, normal estimation and registration
+        run on it, and get_kd_tree() and get_point_cloud() of active points are made of it.
+
+        Returns:
+            pcd (o3d.geometry.PointCloud): cached point cloud, it mustn't be changed by the caller
+        """
+        if "cloud" not in self.__open3d:
+            self.apply_transformation()
+            pcd = o3d.geometry.PointCloud()
+            pcd.points = o3d.utility.Vector3dVector(self.__xyz)
+            pcd.colors = o3d.utility.Vector3dVector(self.__rgb)
+            self.__open3d["cloud"] = pcd
+        return self.__open3d["cloud"]
+
+    def get_kd_tree(self):
+        """Open3d KD-tree of all points for neighbourhood searches, it is cached with the cloud of get_cloud()"""
+        if "kd_tree" not in self.__open3d:
+            self.__open3d["kd_tree"] = o3d.geometry.KDTreeFlann(self.get_cloud())
+        return self.__open3d["kd_tree"]
+
+    def get_point_cloud(self, all_points=False):
+        """Open3d point cloud of active or all points with the object's oriented normals
+
+        It is the cached cloud of get_cloud(), so saving, visualization and point to plane registration share one
+        conversion. Normals, which weren't estimated yet, are estimated first. If some points aren't active, the cloud
+        of active points is selected from it and cached too.
+
+        Arguments:
+            all_points (bool): if True, the cloud is made of all points, otherwise of active ones
+
+        Returns:
+            pcd (o3d.geometry.PointCloud): cached point cloud, it mustn't be changed by the caller
+        """
+        self.update_normals()
+        pcd = self.get_cloud()
+        if not self.__open3d.get("normals", False):
+            pcd.normals = o3d.utility.Vector3dVector(self.__normals)
+            self.__open3d["normals"] = True
+            self.__open3d.pop("active_cloud", None)
+        if all_points or self.__number_of_active == self.__size:
+            return pcd
+        if "active_cloud" not in self.__open3d:
+            self.__open3d["active_cloud"] = pcd.select_down_sample(self.__active_points.tolist())
+        return self.__open3d["active_cloud"]
 
     def get_normals(self):
-        return self.__normals[self.__active_points]
+        self.update_normals()
+        return self.get_active("normals")
+
+    def update_normals(self):
+        """Estimating normals of points, which were added without normals
+
+        Normals are estimated once for every radius of pending batches on the cached cloud of all points.
+        """
+        if not self.__pending_normals:
+            return
+        for radius in dict.fromkeys(pending[3] for pending in self.__pending_normals):
+            normals = self.calculate_normals(radius=radius)
+            for start, stop, center_of_view, _ in (pending for pending in self.__pending_normals
+                                                   if pending[3] == radius):
+                if center_of_view is None:
+                    self.__normals[start:stop] = normals[start:stop]
+                else:
+                    self.__normals[start:stop] = self.get_positive_normals(normals[start:stop], center_of_view,
+                                                                           self.__xyz[start:stop])
+        self.__pending_normals = []
+        self.__active.pop("normals", None)
 
     def calculate_normals(self, center_of_view=None, radius=0.1):
-        pcd = o3d.geometry.PointCloud()
-        pcd.points = o3d.utility.Vector3dVector(self.__xyz)
-        pcd.colors = o3d.utility.Vector3dVector(self.__rgb)
+        """Normals of all points estimated in radius neighbourhoods on the cached cloud of get_cloud()
+
+        Arguments:
+            center_of_view (numpy.array): point of view from camera, normals are turned to it; if None, they aren't
+                oriented
+            radius (float): radius of searching neighbourhood points
+
+        Returns:
+            normals (numpy.array): normals of all points
+        """
+        pcd = self.get_cloud()
         pcd.estimate_normals(search_param=o3d.geometry.KDTreeSearchParamHybrid(radius=radius, max_nn=30))
-        normals = np.asarray(pcd.normals)
+        # the cloud has the estimated normals now, get_point_cloud() sets the object's ones back
+        self.__open3d["normals"] = False
+        self.__open3d.pop("active_cloud", None)
+        normals = np.array(pcd.normals)
         if center_of_view is None:
             return normals
         else:
-            return self.get_positive_normals(normals, center_of_view)
-
-    def get_positive_normals(self, normals, center_of_view):
-        dist_pos = np.linalg.norm((self.__xyz + normals/100) - center_of_view, axis = 1)
-        dist_neg = np.linalg.norm((self.__xyz - normals/100) - center_of_view, axis = 1)
+            return self.get_positive_normals(normals, center_of_view, self.__xyz)
+
+    def get_positive_normals(self, normals, center_of_view, xyz=None):
+        if xyz is None:
+            self.apply_transformation()
+            xyz = self.__xyz
+        dist_pos = np.linalg.norm((xyz + normals/100) - center_of_view, axis = 1)
+        dist_neg = np.linalg.norm((xyz - normals/100) - center_of_view, axis = 1)
         normals = np.where((dist_neg >= dist_pos)[:, np.newaxis], normals, -normals)
         return normals
 
     def get_center(self):
-        return np.mean(self.__xyz, axis=0)
+        """Mean of all points, it is cached and is moved with points"""
+        if self.__center is None:
+            # mean of points, which weren't transformed yet, is transformed instead of points
+            self.__center = np.mean(self.__xyz, axis=0)
+            if self.__transformation is not None:
+                self.__center = self.__transformation[:3, :3] @ self.__center + self.__transformation[:3, 3]
+        return np.copy(self.__center)
 
 
 if __name__ == "__main__":
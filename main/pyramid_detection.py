@@ -0,0 +1,107 @@
+import numpy as np
+from scipy.ndimage import binary_dilation
+
+import moving_detection
+from moving_detection import create_detector
+
+
+def upsample_mask(mask, scale, shape):
+    """Upsampling mask of downsampled frame to the full resolution
+
+    Arguments:
+        mask (np.ndarray): mask of downsampled frame
+        scale (int): factor of downsampling
+        shape (tuple): height and width of full frame
+
+    Return:
+        full_mask (np.ndarray): mask of full frame, every pixel is taken from its coarse pixel
+    """
+    full_mask = np.repeat(np.repeat(mask, scale, axis=0), scale, axis=1)
+    return full_mask[:shape[0], :shape[1]]
+
+
+class PyramidDetector:
+    """Detector which finds foreground on downsampled frame and refines it only near coarse foreground
+
+    Coarse detector works with every scale-th pixel of frame. Its mask is dilated and upsampled, and the full
+    resolution detector classifies and updates only pixels inside this region of interest, the others are background.
+    Detectors without region of interest (FrameDifference, RGB_MoG) process the whole frame and their mask is cut by
+    region of interest.
+
+    Attributes:
+        __scale (int): factor of downsampling
+        __dilation (int): number of iterations of dilation of coarse mask, in coarse pixels
+        __coarse_detector: detector of downsampled frames
+        __fine_detector: detector of full frames
+        __use_roi (bool): True if fine detector supports region of interest
+        __roi (np.ndarray): region of interest of the last frame
+        __mask (np.ndarray): mask of the last frame
+    """
+
+    def __init__(self, detector_class, rgb_im, depth_im=None, scale=2, dilation=2, **parameters):
+        self.__scale = scale
+        self.__dilation = dilation
+        self.__coarse_detector = create_detector(detector_class, *self.downsample(rgb_im, depth_im), **parameters)
+        self.__fine_detector = create_detector(detector_class, rgb_im, depth_im, **parameters)
+        self.__use_roi = detector_class not in (moving_detection.FrameDifference, moving_detection.RGB_MoG)
+
+        self.__roi = np.zeros(rgb_im.shape[:2], dtype=bool)
+        self.__mask = np.zeros(rgb_im.shape[:2])
+
+    def downsample(self, rgb_im, depth_im=None):
+        """Taking every scale-th pixel of frame
+
+        Arguments:
+            rgb_im (np.ndarray): rgb image
+            depth_im (np.ndarray): depth image
+
+        Return:
+            rgb_im, depth_im (np.ndarray): views of downsampled images
+        """
+        rgb_im = rgb_im[::self.__scale, ::self.__scale]
+        if depth_im is not None:
+            depth_im = depth_im[::self.__scale, ::self.__scale]
+        return rgb_im, depth_im
+
+    def get_roi(self):
+        return self.__roi
+
+    def get_mask(self, rgb_im, depth_im=None):
+        """Making mask of moving object
+
+        Arguments:
+            rgb_im (np.ndarray): current rgb image
+            depth_im (np.ndarray): current depth image
+
+        Return:
+            mask (np.ndarray): mask of the whole frame
+        """
+        return self.process(rgb_im, depth_im, np.empty(self.__mask.shape))
+
+    def process(self, rgb_im, depth_im=None, out=None):
+        """Making mask of the next frame
+
+        Arguments:
+            rgb_im (np.ndarray): current rgb image
+            depth_im (np.ndarray): current depth image
+            out (np.ndarray): array for mask; if None, the mask of detector is returned and is rewritten by next frame
+
+        Return:
+            mask (np.ndarray): mask of the fine detector, where moving pixels are nonzero: 1 for ViBE and DEVB, 255 for
+                the others
+        """
+        coarse_mask = self.__coarse_detector.process(*self.downsample(rgb_im, depth_im)) > 0
+        if self.__dilation > 0 and np.any(coarse_mask):
+            coarse_mask = binary_dilation(coarse_mask, iterations=self.__dilation)
+        self.__roi[...] = upsample_mask(coarse_mask, self.__scale, self.__roi.shape)
+
+        if self.__use_roi:
+            self.__fine_detector.process(rgb_im, depth_im, out=self.__mask, roi=self.__roi)
+        else:
+            self.__fine_detector.process(rgb_im, depth_im, out=self.__mask)
+            self.__mask[np.logical_not(self.__roi)] = 0
+
+        if out is None:
+            return self.__mask
+        np.copyto(out, self.__mask)
+        return out
@@ -0,0 +1,289 @@
+"""Processing of frames by bands in separate processes
+
+Frames and masks are passed through shared memory. The model of every band is a shard in shared memory too: arrays of
+the model, which detector updates in place, are moved there after the detector is created, so the main process can
+inspect them by get_models; gaussians of RGBD_MoG, which are stacked only by get_state, stay private. Shards include
+halo rows and have layouts of their detectors, so TiledDetector can't be saved by moving_detection.save_detector, and
+a checkpoint of a whole-frame detector can't be split into bands.
+"""
+import os
+import weakref
+import numpy as np
+from multiprocessing import Pipe, Process
+from multiprocessing.shared_memory import SharedMemory
+
+import moving_detection
+from moving_detection import create_detector
+
+# arrays of get_state, which are passed through buffers of TiledDetector instead of model shards
+FRAME_ARRAYS = ("rgb", "depth", "mask")
+
+
+def split_into_bands(height, number_of_bands, halo):
+    """Splitting rows of image into horizontal bands
+
+    Arguments:
+        height (int): number of rows of image
+        number_of_bands (int): number of bands
+        halo (int): number of rows added to each side of band
+
+    Return:
+        bands (list): tuples (start, stop, halo_start, halo_stop) of rows of every band
+    """
+    bounds = np.linspace(0, height, min(number_of_bands, height) + 1).astype(int)
+    return [(start, stop, max(start - halo, 0), min(stop + halo, height)) for start, stop in
+            zip(bounds[:-1], bounds[1:])]
+
+
+def shared_model_arrays(detector):
+    """Arrays of model of detector, which are kept by it and can be moved into shared memory
+
+    Frames and masks are passed through buffers of TiledDetector, arrays which get_state makes on request (e.g. stacked
+    gaussians of RGBD_MoG) aren't kept by detector and stay private to the worker.
+
+    Return:
+        arrays (dict): arrays by names of get_state
+        owners (dict): lists of (object, attribute) which keep every array
+    """
+    _, model = detector.get_state()
+    objects = [detector] + [value for value in vars(detector).values() if hasattr(value, "__dict__") and
+                            not isinstance(value, (np.ndarray, type))]
+    arrays, owners = {}, {}
+    for name, array in model.items():
+        if name in FRAME_ARRAYS or not isinstance(array, np.ndarray) or array.ndim == 0:
+            continue
+        owners[name] = [(owner, attribute) for owner in objects for attribute, value in vars(owner).items() if
+                        value is array]
+        if owners[name]:
+            arrays[name] = array
+        else:
+            del owners[name]
+    return arrays, owners
+
+
+def tile_worker(connection, detector_class, parameters, band, buffers):
+    """Process which keeps the detector of one band
+
+    Detector is created from the first frame in shared memory. Shapes and dtypes of its model arrays are sent to the
+    main process, which answers with shared memory for them, and the arrays are moved there. After every message from
+    connection the next frame is taken from shared memory, and the mask of the band without halo is written back. None
+    stops the process.
+
+    Arguments:
+        connection (multiprocessing.connection.Connection): connection to the main process
+        detector_class (type): class of detector
+        parameters (dict): parameters of detector
+        band (tuple): start, stop, halo_start, halo_stop rows of band
+        buffers (dict): shared memory, shape and dtype of "rgb", "depth" and "mask" images
+    """
+    start, stop, halo_start, halo_stop = band
+    images = {name: np.ndarray(shape, dtype=dtype, buffer=memory.buf) for name, (memory, shape, dtype) in
+              buffers.items()}
+    rgb_im = images["rgb"][halo_start:halo_stop]
+    depth_im = images["depth"][halo_start:halo_stop] if "depth" in images else None
+
+    # detectors copy the frames they keep, so views of shared memory are passed
+    detector = create_detector(detector_class, rgb_im, depth_im, **parameters)
+
+    arrays, owners = shared_model_arrays(detector)
+    connection.send({name: (array.shape, array.dtype) for name, array in arrays.items()})
+    model_buffers = connection.recv()
+    for name, (memory, shape, dtype) in model_buffers.items():
+        shard = np.ndarray(shape, dtype=dtype, buffer=memory.buf)
+        np.copyto(shard, arrays[name])
+        for owner, attribute in owners[name]:
+            setattr(owner, attribute, shard)
+    # private copies of model are released, the detector keeps only shards
+    del arrays, owners
+    connection.send(True)
+
+    while connection.recv() is not None:
+        mask = detector.process(rgb_im, depth_im)
+        images["mask"][start:stop] = mask[start - halo_start:stop - halo_start]
+        connection.send(True)
+
+    del images, detector
+    connection.close()
+
+
+def release_resources(connections, processes, memories, timeout=5):
+    """Stopping processes and releasing shared memory of TiledDetector
+
+    Workers, which have died or don't stop in timeout seconds, are terminated, so the memory is released anyway. It is
+    a function of lists, not a method, so weakref.finalize can call it after TiledDetector is collected.
+
+    Arguments:
+        connections (list): connections to processes
+        processes (list): processes of bands
+        memories (list): shared memory made by TiledDetector
+    """
+    for connection in connections:
+        try:
+            connection.send(None)
+        except (OSError, ValueError):
+            pass
+    for process in processes:
+        process.join(timeout)
+        if process.is_alive():
+            process.terminate()
+            process.join()
+    for connection in connections:
+        connection.close()
+    for memory in memories:
+        # arrays of the caller (e.g. masks returned by process) can keep the memory mapped until they are collected,
+        # but the name is removed anyway
+        try:
+            memory.close()
+        except BufferError:
+            pass
+        try:
+            memory.unlink()
+        except FileNotFoundError:
+            pass
+    connections.clear()
+    processes.clear()
+    memories.clear()
+
+
+class TiledDetector:
+    """Detector which processes horizontal bands of frame in separate processes
+
+    Every process keeps the model of its band with halo rows on both sides, so detectors which use neighbours (ViBE,
+    DEVB) see them near the borders of band. Frames, masks and shards of models are kept in shared memory, which is
+    released by close, by the end of with block or when the detector is collected. Models of halo rows are updated
+    independently by neighbouring bands, so ViBE and DEVB are slightly different from the whole-frame ones; other
+    detectors give the same masks.
+
+    Attributes:
+        __buffers (dict): shared memory, shape and dtype of "rgb", "depth" and "mask" images
+        __images (dict): arrays in shared memory
+        __models (list): arrays of model of every band in shared memory by names of get_state
+        __memories (list): all shared memory of detector
+        __connections (list): connections to processes
+        __processes (list): processes of bands
+        __finalizer (weakref.finalize): release_resources of the lists above
+    """
+
+    def __init__(self, detector_class, rgb_im, depth_im=None, number_of_bands=None, halo=None, **parameters):
+        if number_of_bands is None:
+            number_of_bands = os.cpu_count()
+        if halo is None:
+            halo = parameters.get("neighbourhood_area", 4) if detector_class in (
+                moving_detection.ViBЕ, moving_detection.DEVB) else 0
+
+        self.__memories = []
+        self.__connections = []
+        self.__processes = []
+        self.__models = []
+        self.__finalizer = weakref.finalize(self, release_resources, self.__connections, self.__processes,
+                                            self.__memories)
+
+        try:
+            self.__buffers = {"rgb": self.create_buffer(rgb_im.shape, rgb_im.dtype),
+                              "mask": self.create_buffer(rgb_im.shape[:2], float)}
+            if depth_im is not None:
+                self.__buffers["depth"] = self.create_buffer(depth_im.shape, depth_im.dtype)
+            self.__images = {name: np.ndarray(shape, dtype=dtype, buffer=memory.buf) for name, (memory, shape, dtype)
+                             in self.__buffers.items()}
+            self.set_images(rgb_im, depth_im)
+
+            for band in split_into_bands(rgb_im.shape[0], number_of_bands, halo):
+                connection, worker_connection = Pipe()
+                process = Process(target=tile_worker,
+                                  args=(worker_connection, detector_class, parameters, band, self.__buffers),
+                                  daemon=True)
+                process.start()
+                worker_connection.close()
+                self.__connections.append(connection)
+                self.__processes.append(process)
+            for connection in self.__connections:
+                model_buffers = {name: self.create_buffer(shape, dtype) for name, (shape, dtype) in
+                                 connection.recv().items()}
+                connection.send(model_buffers)
+                self.__models.append({name: np.ndarray(shape, dtype=dtype, buffer=memory.buf) for
+                                      name, (memory, shape, dtype) in model_buffers.items()})
+            for connection in self.__connections:
+                connection.recv()
+        except BaseException:
+            self.close()
+            raise
+
+    def create_buffer(self, shape, dtype):
+        """Shared memory for array, it is released with the detector"""
+        memory = SharedMemory(create=True, size=max(int(np.prod(shape)) * np.dtype(dtype).itemsize, 1))
+        self.__memories.append(memory)
+        return memory, shape, np.dtype(dtype)
+
+    def set_images(self, rgb_im, depth_im=None):
+        self.__images["rgb"][...] = rgb_im
+        if depth_im is not None:
+            self.__images["depth"][...] = depth_im
+
+    def get_mask(self, rgb_im, depth_im=None):
+        """Making mask of moving object
+
+        Arguments:
+            rgb_im (np.ndarray): current rgb image
+            depth_im (np.ndarray): current depth image
+
+        Return:
+            mask (np.ndarray): mask of the whole frame
+        """
+        return self.process(rgb_im, depth_im, np.empty(self.__images["mask"].shape))
+
+    def process(self, rgb_im, depth_im=None, out=None):
+        """Making mask of the next frame
+
+        Arguments:
+            rgb_im (np.ndarray): current rgb image
+            depth_im (np.ndarray): current depth image
+            out (np.ndarray): array for mask; if None, the mask in shared memory is returned and is rewritten by next
+                frame
+
+        Return:
+            mask (np.ndarray): mask of the whole frame
+        """
+        self.set_images(rgb_im, depth_im)
+        for connection in self.__connections:
+            connection.send(True)
+        for connection in self.__connections:
+            connection.recv()
+        if out is None:
+            return self.__images["mask"]
+        np.copyto(out, self.__images["mask"])
+        return out
+
+    def get_models(self):
+        """Shards of models of bands in shared memory
+
+        Arrays are updated by workers in place while frames are processed, they include halo rows of bands and are
+        valid until close.
+
+        Return:
+            models (list): read-only arrays of model of every band by names of get_state of detector
+        """
+        models = []
+        for model in self.__models:
+            models.append({})
+            for name, array in model.items():
+                models[-1][name] = array.view()
+                models[-1][name].flags.writeable = False
+        return models
+
+    def close(self):
+        """Stopping processes and releasing shared memory, workers which have died are tolerated"""
+        self.__images = {}
+        self.__buffers = {}
+        self.__models = []
+        self.__finalizer()
+
+    def get_state(self):
+        """Shards of models overlap by halo rows and have layouts of their detectors, so there is no state for
+        save_detector"""
+        raise TypeError("TiledDetector can't be saved: models of bands are shards with halo rows, see get_models")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
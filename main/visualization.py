@@ -49,9 +49,7 @@ def visualize_object(objects):
 
     for i in range(len(objects)):
         if objects[i].visible:
-            pcds.append(open3d.geometry.PointCloud())
-            pcds[len(pcds) - 1].points = open3d.utility.Vector3dVector(objects[i].get_points()[0])
-            pcds[len(pcds) - 1].colors = open3d.utility.Vector3dVector(objects[i].get_points()[1])
+            pcds.append(objects[i].get_point_cloud())
             vis.add_geometry(pcds[- 1])
 
     points_axis = [[0, 0, 0], [.1, 0, 0], [0, .1, 0], [0, 0, .1]]
@@ -73,10 +71,7 @@ def visualize(objects=None, points=None, points_color=None, lines=None, lines_po
     if objects is not None:
         for obj in objects:
             if obj.visible:
-                pcds = open3d.geometry.PointCloud()
-                pcds.points = open3d.utility.Vector3dVector(obj.get_points()[0])
-                pcds.colors = open3d.utility.Vector3dVector(obj.get_points()[1])
-                vis.add_geometry(pcds)
+                vis.add_geometry(obj.get_point_cloud())
 
     if points is not None:
         pcd = open3d.geometry.PointCloud()